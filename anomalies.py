@@ -0,0 +1,229 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from data_store import SharedDataset, add_dataset_arguments, dataset_filters, load_dataset
+
+# Níveis das séries: cada combinação de valores das colunas de um nível é uma série
+LEVELS = (('city',), ('restaurant_name',), ('city', 'restaurant_name'))
+METRICS = ('orders', 'revenue', 'cancellation_rate', 'avg_rating')
+# Janela móvel (dias anteriores a cada dia) e limiar do z-score robusto
+WINDOW = 28
+THRESHOLD = 3.5
+# Pedidos mínimos no dia para as taxas (cancelamento e avaliação) entrarem na comparação
+MIN_ORDERS = 5
+# Elementos das janelas ordenados por bloco de séries (limita a memória das ordenações)
+BLOCK_ELEMENTS = 1 << 21
+# Fator que torna o MAD comparável ao desvio padrão (distribuição normal)
+MAD_SCALE = 1.4826
+
+
+def level_name(columns):
+    return '/'.join(columns)
+
+
+class DailySeries:
+    """Medidas diárias de todas as séries (cidade, restaurante, cidade x restaurante) em matrizes 2-D.
+
+    Uma linha por série e uma coluna por dia do período (ou bloco de `bucket_days` dias),
+    com zero nos dias sem pedidos, então as estatísticas móveis são calculadas para todas
+    as séries de uma vez, sem percorrer os grupos.
+    """
+
+    def __init__(self, series, dates, measures):
+        self.series = series  # DataFrame (level, series) alinhado às linhas das matrizes
+        self.dates = dates  # início de cada dia/bloco, alinhado às colunas
+        self.measures = measures  # orders, revenue, cancelled, rating_sum
+
+    @classmethod
+    def from_view(cls, view, levels=LEVELS, bucket_days=1):
+        """Séries das linhas de uma DatasetView (pesos da amostra no modo prévia)"""
+        dataset = view.dataset
+        rows = np.arange(len(dataset)) if view.rows is None else view.rows
+        weights = np.ones(len(rows)) if view.weights is None else np.asarray(view.weights, dtype=float)
+
+        # Dia (bloco) de cada pedido: cada data distinta é convertida uma única vez
+        date_codes, date_values = dataset.codes('order_date')
+        dates = pd.to_datetime(pd.Index(date_values), format='%Y-%m-%d', errors='coerce')
+        start = dates.min()
+        day_of_date = np.full(len(dates) + 1, -1)  # -1 (data ausente ou inválida) no final
+        day_of_date[:-1][dates.notna()] = (dates[dates.notna()] - start).days // bucket_days
+        day = day_of_date[date_codes[rows]]
+        n_days = day.max() + 1 if len(day) else 0
+
+        status_codes, statuses = dataset.codes('delivery_status')
+        cancelled = np.append(np.asarray(statuses) == 'Cancelled', False)[status_codes[rows]]
+        price, rating = (dataset.df[name].to_numpy(dtype=float)[rows] for name in ('price', 'rating'))
+
+        # Série de cada pedido em cada nível (códigos das séries contínuos entre os níveis)
+        names, row_positions, row_series = [], [], []
+        for columns in levels:
+            columns_codes = [dataset.codes(column) for column in columns]
+            codes = [column_codes[rows] for column_codes, _ in columns_codes]
+            present = np.flatnonzero(np.logical_and.reduce([day >= 0] + [column_codes >= 0 for column_codes in codes]))
+            shape = tuple(len(uniques) for _, uniques in columns_codes)
+            flat = np.ravel_multi_index([column_codes[present] for column_codes in codes], shape)
+            values, series_of_row = np.unique(flat, return_inverse=True)
+            labels = [np.asarray(uniques)[positions]
+                      for (_, uniques), positions in zip(columns_codes, np.unravel_index(values, shape))]
+            names.append(pd.DataFrame({
+                'level': level_name(columns),
+                'series': [' / '.join(map(str, combination)) for combination in zip(*labels)]
+            }))
+            row_series.append(series_of_row + sum(len(frame) for frame in names[:-1]))
+            row_positions.append(present)
+        series = pd.concat(names, ignore_index=True)
+        row_positions, row_series = np.concatenate(row_positions), np.concatenate(row_series)
+
+        cells = row_series * n_days + day[row_positions]
+        row_weights = weights[row_positions]
+        measures = {
+            name: np.bincount(cells, weights=value, minlength=len(series) * n_days).reshape(len(series), n_days)
+            for name, value in (
+                ('orders', row_weights),
+                ('revenue', price[row_positions] * row_weights),
+                ('cancelled', cancelled[row_positions] * row_weights),
+                ('rating_sum', rating[row_positions] * row_weights)
+            )
+        }
+        return cls(series, start + pd.to_timedelta(np.arange(n_days) * bucket_days, unit='D'), measures)
+
+    @classmethod
+    def from_frame(cls, df, levels=LEVELS, bucket_days=1):
+        return cls.from_view(SharedDataset(df).select(), levels, bucket_days)
+
+    def __len__(self):
+        return len(self.series)
+
+    def metrics(self, min_orders=MIN_ORDERS):
+        """Matrizes das métricas; as taxas ficam NaN nos dias com menos de `min_orders` pedidos"""
+        orders = self.measures['orders']
+        enough = orders >= max(min_orders, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'orders': orders,
+                'revenue': self.measures['revenue'],
+                'cancellation_rate': np.where(enough, self.measures['cancelled'] / orders * 100, np.nan),
+                'avg_rating': np.where(enough, self.measures['rating_sum'] / orders, np.nan)
+            }
+
+
+# Mediana de cada linha com `count` valores válidos; ordena `windows` no próprio array
+# (os NaN vão para o fim da linha)
+def _nan_median(windows, count):
+    windows.sort(axis=1)
+    rows = np.arange(len(windows))
+    return (windows[rows, np.maximum(count - 1, 0) // 2] + windows[rows, count // 2]) / 2
+
+
+# Soma de `flags` nos `window` dias anteriores a cada dia, a partir do dia `window` (somas acumuladas)
+def _rolling_sum(flags, window):
+    total = np.concatenate([np.zeros((len(flags), 1), dtype=np.int64), np.cumsum(flags, axis=1)], axis=1)
+    return total[:, window:-1] - total[:, :-window - 1]
+
+
+def rolling_baseline(values, window=WINDOW, min_periods=None):
+    """Mediana e escala robusta dos `window` dias anteriores a cada dia, para todas as séries.
+
+    `values` tem uma linha por série e uma coluna por dia (NaN = dia sem valor). A escala é o
+    MAD x 1.4826. Nos primeiros `window` dias e quando a janela tem menos de `min_periods`
+    dias válidos (padrão: metade da janela), a mediana fica NaN e a escala zero. Só as janelas que podem ter MAD
+    diferente de zero são ordenadas: com mais da metade dos dias em zero (séries esparsas),
+    mediana e MAD são zero e as contagens acumuladas já bastam.
+    """
+    values = np.asarray(values, dtype=np.float32)
+    median = np.full(values.shape, np.nan, dtype=np.float32)
+    scale = np.zeros(values.shape, dtype=np.float32)
+    if values.shape[1] <= window:
+        return median, scale
+
+    count = _rolling_sum(~np.isnan(values), window)
+    zeros = _rolling_sum(values == 0, window)
+    enough = count >= (window // 2 if min_periods is None else max(min_periods, 1))
+    median[:, window:][enough] = 0
+    series, days = np.nonzero(enough & (2 * zeros <= count))
+    # Janela do dia `window + d` = windows[:, d]; as janelas escolhidas são copiadas em blocos
+    windows = sliding_window_view(values, window, axis=1)
+    step = max(1, BLOCK_ELEMENTS // window)
+    for start in range(0, len(series), step):
+        block_series, block_days = series[start:start + step], days[start:start + step]
+        block, block_count = windows[block_series, block_days], count[block_series, block_days]
+        block_median = _nan_median(block, block_count)
+        median[block_series, block_days + window] = block_median
+        deviations = np.abs(block - block_median[:, None], out=block)
+        scale[block_series, block_days + window] = _nan_median(deviations, block_count) * MAD_SCALE
+    return median, scale
+
+
+def robust_scores(values, window=WINDOW, min_periods=None):
+    """Z-score robusto de cada dia em relação aos `window` dias anteriores, e a mediana usada.
+
+    NaN onde não há referência (ver rolling_baseline) ou o MAD é zero (mais da metade da
+    janela com o mesmo valor; em séries esparsas, agregue mais dias com `bucket_days`).
+    """
+    median, scale = rolling_baseline(values, window, min_periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(scale > 0, (values - median) / scale, np.nan)
+    return scores, median
+
+
+def detect(daily, window=WINDOW, threshold=THRESHOLD, min_orders=MIN_ORDERS, metrics=METRICS):
+    """Anomalias (|z-score robusto| acima do limiar) de todas as séries, da mais forte para a mais fraca"""
+    frames = []
+    for metric, values in daily.metrics(min_orders).items():
+        if metric not in metrics:
+            continue
+        scores, median = robust_scores(values, window)
+        with np.errstate(invalid='ignore'):
+            series, days = np.nonzero(np.abs(scores) > threshold)
+        frames.append(pd.DataFrame({
+            'level': daily.series['level'].to_numpy()[series],
+            'series': daily.series['series'].to_numpy()[series],
+            'metric': metric,
+            'date': daily.dates[days],
+            'value': values[series, days],
+            'median': median[series, days].astype(float),
+            'score': scores[series, days]
+        }))
+    anomalies = pd.concat(frames, ignore_index=True)
+    order = np.argsort(-np.abs(anomalies['score'].to_numpy()), kind='stable')
+    return anomalies.iloc[order].reset_index(drop=True)
+
+
+def series_detail(daily, level, series, metric, window=WINDOW, min_orders=MIN_ORDERS):
+    """Valores, mediana móvel e z-score de uma série, dia a dia (para gráficos)"""
+    row = np.flatnonzero((daily.series['level'] == level).to_numpy() & (daily.series['series'] == series).to_numpy())
+    values = daily.metrics(min_orders)[metric][row]
+    scores, median = robust_scores(values, window)
+    return pd.DataFrame({'value': values[0], 'median': median[0], 'score': scores[0]},
+                        index=daily.dates.rename('date'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Anomalias nas séries diárias por cidade e restaurante')
+    parser.add_argument('--window', type=int, default=WINDOW, help='Dias anteriores usados como referência')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='Limiar do z-score robusto')
+    parser.add_argument('--bucket-days', type=int, default=1, help='Dias agregados em cada ponto da série')
+    parser.add_argument('--min-orders', type=int, default=MIN_ORDERS,
+                        help='Pedidos mínimos no dia para as taxas de cancelamento e avaliação')
+    parser.add_argument('--top', type=int, default=10, help='Anomalias mostradas por métrica')
+    args = add_dataset_arguments(parser).parse_args()
+
+    df = load_dataset(args.dataset, dataset_filters(args))
+    start = time.perf_counter()
+    daily = DailySeries.from_frame(df, bucket_days=args.bucket_days)
+    anomalies = detect(daily, args.window, args.threshold, args.min_orders)
+    elapsed = time.perf_counter() - start
+
+    pd.set_option('display.width', None)
+    print(f"{len(daily):,} séries x {len(daily.dates):,} pontos, {len(anomalies):,} anomalias "
+          f"(|z| > {args.threshold}, janela de {args.window}) em {elapsed:.3f} s")
+    print("\nAnomalias por nível e métrica:")
+    print(anomalies.groupby(['level', 'metric']).size().unstack(fill_value=0))
+    for metric in METRICS:
+        top = anomalies[anomalies['metric'] == metric].head(args.top)
+        print(f"\n{metric}: maiores desvios")
+        print(top.drop(columns='metric').to_string(index=False, float_format="%.2f") if len(top) else "  nenhuma")
@@ -0,0 +1,79 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Número máximo de figuras guardadas (as menos usadas recentemente saem primeiro)
+MAX_CHARTS = 256
+
+
+# Acrescenta ao hash o conteúdo de um agregado (Series, DataFrame, Index, array, tupla, escalar)
+def _update(digest, value):
+    if isinstance(value, pd.Index):
+        digest.update(repr(('Index', value.names)).encode())
+        digest.update(pd.util.hash_pandas_object(value).to_numpy().tobytes())
+    elif isinstance(value, (pd.Series, pd.DataFrame)):
+        names = value.columns.tolist() if isinstance(value, pd.DataFrame) else value.name
+        digest.update(repr((type(value).__name__, names, value.index.names)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        if value.dtype == object:
+            digest.update(pd.util.hash_array(value.ravel()).tobytes())
+        else:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (tuple, list)):
+        digest.update(f'{type(value).__name__}:{len(value)}'.encode())
+        for item in value:
+            _update(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+
+def aggregate_hash(data):
+    """Hash do conteúdo dos dados de um gráfico (valores, índices e nomes)"""
+    digest = hashlib.blake2b(digest_size=16)
+    _update(digest, data)
+    return digest.hexdigest()
+
+
+class ChartCache:
+    """Figuras plotly já construídas, indexadas por (id do gráfico, hash dos dados, tema).
+
+    Compartilhado entre reexecuções e sessões: um gráfico cujos dados não mudaram não é
+    reconstruído (a construção pelo plotly express é a parte cara da renderização).
+    As figuras guardadas são compartilhadas e não devem ser alteradas.
+    """
+
+    def __init__(self, max_entries=MAX_CHARTS):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._figures)
+
+    def figure(self, chart_id, data, build, theme=None):
+        """Figura do gráfico `chart_id` para `data`, construída por `build()` só na primeira vez.
+
+        `chart_id` deve identificar também os parâmetros do gráfico que não estão em `data`
+        (método, dimensão escolhida, ...).
+        """
+        key = (chart_id, aggregate_hash(data), theme)
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+
+        figure = build()
+        with self._lock:
+            self.misses += 1
+            self._figures[key] = figure
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
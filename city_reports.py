@@ -0,0 +1,199 @@
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import report_sections as sections
+from customers import CustomerStore, build_profiles
+from data_store import add_dataset_arguments, dataset_filters, load_dataset
+
+# Diretório de saída padrão (um subdiretório por grupo)
+OUTPUT_DIR = 'city_reports'
+FORMATS = ('txt', 'json', 'csv')
+
+# Agregados de todos os grupos, compartilhados com os processos uma vez (initializer do pool)
+_aggregates = None
+
+
+def _init_worker(aggregates):
+    global _aggregates
+    _aggregates = aggregates
+
+
+# Nome de diretório seguro para o rótulo do grupo (únicos entre si)
+def _slugs(labels):
+    slugs, seen = [], set()
+    for label in labels:
+        slug = re.sub(r'[^\w.-]+', '_', str(label)).strip('_') or 'group'
+        candidate, suffix = slug, 1
+        while candidate in seen:
+            suffix += 1
+            candidate = f'{slug}_{suffix}'
+        seen.add(candidate)
+        slugs.append(candidate)
+    return slugs
+
+
+# Dimensão do detalhamento de cada relatório: faixa etária, ou cidade no relatório por faixa etária
+def _breakdown(by):
+    return 'city' if by == 'age' else 'age'
+
+
+# Ordena uma tabela pelo grupo (primeiro nível do índice) e guarda os limites de cada
+# grupo: o relatório de um grupo lê só uma fatia contígua, sem nova busca na tabela
+def _pre_group(table, labels):
+    codes = labels.get_indexer(table.index.get_level_values(0))
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes, minlength=len(labels))
+    ends = np.cumsum(counts)
+    return table.iloc[order].droplevel(0), np.column_stack([ends - counts, ends])
+
+
+# Clientes distintos de cada grupo de `keys` por status de churn (o do perfil do cliente,
+# não o de cada pedido)
+def _customer_counts(df, keys, profiles, labels):
+    pairs = df[keys + ['customer_id']].drop_duplicates()
+    churned = pairs['customer_id'].map(profiles['churned'])
+    key_columns = [pairs[key] for key in keys]
+    return {
+        f'num_{status.lower()}': churned.eq(status).groupby(key_columns, sort=False).sum().reindex(labels, fill_value=0)
+        for status in ('Inactive', 'Active')
+    }
+
+
+def report_aggregates(df, by, profiles=None):
+    """Métricas e tabelas de todos os grupos de `by`: as mesmas das seções por cidade e
+    por faixa etária, cada uma em uma única passada de groupby sobre o dataset inteiro.
+    As contagens de clientes ativos/inativos (do grupo e de cada detalhamento) usam a tabela de clientes (`profiles`, de
+    CustomerStore; construída a partir de `df` quando não informada)."""
+    breakdown = _breakdown(by)
+    metrics = sections.grouped_metrics(df, [by])
+    if profiles is None:
+        profiles = build_profiles(df)
+    for name, counts in _customer_counts(df, [by], profiles, metrics.index).items():
+        metrics[name] = counts.to_numpy()
+    by_breakdown = sections.grouped_metrics(df, [by, breakdown])
+    for name, counts in _customer_counts(df, [by, breakdown], profiles, by_breakdown.index).items():
+        by_breakdown[name] = counts.to_numpy()
+    tables = {
+        f'by_{breakdown}': by_breakdown,
+        'monthly_orders': df.groupby([by, 'order_month']).size().rename('count'),
+        'spend_by_payment_method': df.groupby([by, 'payment_method'])['price'].mean(),
+        'spend_by_gender': df.groupby([by, 'gender'])['price'].mean()
+    }
+    return {
+        'metrics': metrics,
+        'tables': {name: _pre_group(table, metrics.index) for name, table in tables.items()}
+    }
+
+
+# Relatório de um grupo (código na ordem de `metrics`) a partir dos agregados de todos os grupos
+def group_report(aggregates, code):
+    tables = {}
+    for name, (table, bounds) in aggregates['tables'].items():
+        start, end = bounds[code]
+        tables[name] = table.iloc[start:end]
+    for name in ('spend_by_payment_method', 'spend_by_gender'):
+        tables[name] = tables[name].sort_values(ascending=False)
+    return {'metrics': aggregates['metrics'].iloc[code].to_dict(), 'tables': tables}
+
+
+# Relatório em texto no formato da seção por cidade do EDA.py
+def format_report(label, by, report):
+    metrics = report['metrics']
+    lines = [
+        '=' * 50,
+        f"{by.replace('_', ' ').upper()}: {label}",
+        '=' * 50,
+        f"Number of Orders: {metrics['num_orders']:,}",
+        f"Average Rating: {metrics['avg_rating']:.1f}",
+        f"Average Order Frequency: {metrics['avg_order_freq']:.0f} orders",
+        f"Total Amount Spent: {metrics['total_spent']: ,.2f} currency units",
+        f"Average Price per Order: {metrics['avg_price']: ,.2f} currency units",
+        f"Principal Payment Methods: {metrics['top_payment_method']}",
+        f"Number of Unique Restaurants: {metrics['num_restaurants']} restaurants",
+        f"Most Popular Restaurant: {metrics['top_restaurant']}",
+        f"Most Popular Category: {metrics['top_category']}",
+        f"Most Popular Dish: {metrics['top_dish']}",
+        f"Number of Inactive Customers: {metrics['num_inactive']}",
+        f"Number of Active Customers: {metrics['num_active']}",
+        f"Number of Cancellations: {metrics['num_cancellations']} cancellations"
+    ]
+    for name, table in report['tables'].items():
+        lines += ['-' * 50, name.replace('_', ' ').capitalize() + ':', table.to_string(float_format='{:.2f}'.format)]
+    return '\n'.join(lines) + '\n'
+
+
+# Escalares do NumPy no JSON
+def _json_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def write_report(directory, label, by, report, formats=FORMATS):
+    os.makedirs(directory, exist_ok=True)
+    if 'txt' in formats:
+        with open(os.path.join(directory, 'report.txt'), 'w', encoding='utf-8') as f:
+            f.write(format_report(label, by, report))
+    if 'json' in formats:
+        with open(os.path.join(directory, 'metrics.json'), 'w', encoding='utf-8') as f:
+            json.dump({by: label, **report['metrics']}, f, indent=2, ensure_ascii=False, default=_json_value)
+    if 'csv' in formats:
+        for name, table in report['tables'].items():
+            table.to_csv(os.path.join(directory, f'{name}.csv'))
+
+
+# Tarefa de um grupo: monta e grava o relatório no processo
+def _report_task(code, label, by, directory, formats):
+    write_report(directory, label, by, group_report(_aggregates, code), formats)
+
+
+def generate_reports(df, by='city', output=OUTPUT_DIR, workers=1, formats=FORMATS, profiles=None):
+    """Gera um relatório (txt, json e tabelas csv) por valor de `by` em `output/<grupo>/`.
+
+    Os agregados de todos os grupos são calculados uma única vez e compartilhados com os
+    processos pelo initializer do pool; cada processo só fatia, formata e grava os
+    relatórios dos seus grupos. Retorna o índice com as métricas de todos os grupos
+    (gravado também em `output/index.csv`).
+    """
+    aggregates = report_aggregates(df, by, profiles)
+    labels = list(aggregates['metrics'].index)
+    directories = [os.path.join(output, slug) for slug in _slugs(labels)]
+    tasks = [range(len(labels)), labels, [by] * len(labels), directories, [formats] * len(labels)]
+    if workers > 1 and len(labels) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(aggregates,)) as pool:
+            list(pool.map(_report_task, *tasks, chunksize=max(1, len(labels) // (workers * 4))))
+    else:
+        _init_worker(aggregates)
+        list(map(_report_task, *tasks))
+
+    index = aggregates['metrics'].copy()
+    index.insert(0, 'directory', [os.path.basename(directory) for directory in directories])
+    os.makedirs(output, exist_ok=True)
+    index.to_csv(os.path.join(output, 'index.csv'))
+    return index
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Relatórios por cidade (ou outra dimensão) em arquivos')
+    parser.add_argument('--by', default='city', help='Coluna dos grupos (padrão: city)')
+    parser.add_argument('--output', default=OUTPUT_DIR, help='Diretório de saída')
+    parser.add_argument('--format', nargs='+', choices=FORMATS, default=list(FORMATS), dest='formats')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos')
+    args = add_dataset_arguments(parser).parse_args()
+
+    filters = dataset_filters(args)
+    df = load_dataset(args.dataset, filters)
+    if args.by not in df.columns:
+        parser.error(f"coluna desconhecida: '{args.by}'")
+    start = time.perf_counter()
+    profiles = CustomerStore(args.dataset, filters).load(df)
+    index = generate_reports(df, args.by, args.output, args.workers, tuple(args.formats), profiles)
+    elapsed = time.perf_counter() - start
+    print(f"{len(index):,} relatórios por {args.by} em {args.output}/ ({elapsed:.2f} s)")
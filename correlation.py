@@ -0,0 +1,159 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_store import add_dataset_arguments, dataset_files, dataset_filters, iter_file_chunks
+
+# Colunas numéricas e codificadas usadas na matriz de correlação
+CORRELATION_COLUMNS = [
+    'quantity', 'price', 'order_frequency', 'loyalty_points', 'rating',
+    'city_cod', 'dish_name_cod', 'category_cod', 'gender_cod', 'last_order_date_cod',
+    'churned_cod', 'delivery_status_cod', 'payment_method_cod'
+]
+METHODS = ('pearson', 'spearman')
+
+
+class MomentStats:
+    """Estatísticas suficientes da correlação: contagem, médias e produtos cruzados centrados.
+
+    Blocos diferentes são combinados com `merge` (fórmula de Chan et al.), então a matriz
+    pode ser acumulada em uma única passada, bloco a bloco ou em paralelo, com o mesmo
+    resultado de um cálculo sobre todas as linhas de uma vez.
+    """
+
+    def __init__(self, columns, n=0, mean=None, comoment=None):
+        self.columns = list(columns)
+        self.n = n
+        self.mean = np.zeros(len(self.columns)) if mean is None else mean
+        self.comoment = np.zeros((len(self.columns),) * 2) if comoment is None else comoment
+
+    @classmethod
+    def from_array(cls, columns, values):
+        values = values[~np.isnan(values).any(axis=1)]
+        if len(values) == 0:
+            return cls(columns)
+        mean = values.mean(axis=0)
+        centered = values - mean
+        return cls(columns, len(values), mean, centered.T @ centered)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            return other
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        return MomentStats(
+            self.columns, n,
+            self.mean + delta * other.n / n,
+            self.comoment + other.comoment + np.outer(delta, delta) * self.n * other.n / n
+        )
+
+    def correlation(self):
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix = self.comoment / np.outer(std, std)
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+
+
+# Histograma (valor -> contagem) de cada coluna, combinável entre blocos. Só entram as linhas
+# sem valores ausentes, as mesmas que entram nas estatísticas (MomentStats.from_array)
+def column_histograms(frame, columns=CORRELATION_COLUMNS):
+    complete = frame[columns].dropna()
+    return {column: complete[column].value_counts() for column in columns}
+
+
+def merge_histograms(left, right):
+    if left is None:
+        return right
+    return {column: left[column].add(right[column], fill_value=0) for column in left}
+
+
+# Posto médio (midrank) de cada valor, a partir dos histogramas de todo o dataset
+def midrank_tables(histograms):
+    tables = {}
+    for column, counts in histograms.items():
+        counts = counts.sort_index()
+        cumulative = counts.cumsum().to_numpy(dtype=float)
+        tables[column] = (counts.index.to_numpy(), cumulative - (counts.to_numpy() - 1) / 2)
+    return tables
+
+
+# Valores das colunas como matriz (postos, na correlação de Spearman)
+def _values(frame, columns, ranks=None):
+    values = frame[columns].to_numpy(dtype=float)
+    if ranks is None:
+        return values
+    # Linhas com algum valor ausente continuam NaN (descartadas em from_array, como no Pearson)
+    complete = ~np.isnan(values).any(axis=1)
+    ranked = np.full(values.shape, np.nan)
+    for i, column in enumerate(columns):
+        keys, midranks = ranks[column]
+        ranked[complete, i] = midranks[np.searchsorted(keys, values[complete, i])]
+    return ranked
+
+
+def frame_stats(frame, method='pearson', columns=CORRELATION_COLUMNS):
+    """Estatísticas de correlação de um DataFrame já carregado"""
+    ranks = midrank_tables(column_histograms(frame, columns)) if method == 'spearman' else None
+    return MomentStats.from_array(columns, _values(frame, columns, ranks))
+
+
+# Tarefas por arquivo (uma por processo quando há mais de um worker)
+def _file_histograms(file, filters, columns):
+    histograms = None
+    for chunk in iter_file_chunks(*file, filters):
+        histograms = merge_histograms(histograms, column_histograms(chunk, columns))
+    return histograms
+
+
+def _file_moments(file, filters, columns, ranks):
+    stats = MomentStats(columns)
+    for chunk in iter_file_chunks(*file, filters):
+        stats = stats.merge(MomentStats.from_array(columns, _values(chunk, columns, ranks)))
+    return stats
+
+
+def _map_files(func, files, workers, *args):
+    if workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, files, *[[arg] * len(files) for arg in args]))
+    return [func(file, *args) for file in files]
+
+
+def stream_stats(path, filters=None, method='pearson', columns=CORRELATION_COLUMNS, workers=1):
+    """Estatísticas de correlação do dataset inteiro, lido em blocos (um arquivo por processo).
+
+    Spearman faz duas passadas: histogramas dos valores (para os postos médios) e, depois,
+    as estatísticas sobre os postos.
+    """
+    files = dataset_files(path, filters)
+    ranks = None
+    if method == 'spearman':
+        histograms = None
+        for part in _map_files(_file_histograms, files, workers, filters, columns):
+            if part is not None:
+                histograms = merge_histograms(histograms, part)
+        ranks = midrank_tables(histograms or {})
+    stats = MomentStats(columns)
+    for part in _map_files(_file_moments, files, workers, filters, columns, ranks):
+        stats = stats.merge(part)
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Matriz de correlação em streaming (Pearson ou Spearman)')
+    parser.add_argument('--method', choices=METHODS, default='pearson')
+    parser.add_argument('--workers', type=int, default=1, help='Processos (um arquivo de partição por vez)')
+    args = add_dataset_arguments(parser).parse_args()
+
+    start = time.perf_counter()
+    stats = stream_stats(args.dataset, dataset_filters(args), args.method, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    pd.set_option('display.width', None)
+    pd.set_option('display.max_columns', None)
+    print(stats.correlation().round(3))
+    print(f"\n{stats.n:,} linhas em {elapsed:.2f} s ({args.method})")
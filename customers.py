@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_store import (DATASET_PATH, dataset_files, load_dataset, load_files, loader_version,
+                        prune_partitions)
+from report_cache import code_version, file_digests
+
+CUSTOMER_DIR = '.customers'
+# Atributos do cliente repetidos em cada pedido (o valor do pedido mais recente prevalece)
+CUSTOMER_ATTRIBUTES = ['gender', 'age', 'city', 'signup_date', 'last_order_date',
+                       'order_frequency', 'loyalty_points', 'churned']
+# Totais somáveis entre lotes de pedidos
+ORDER_TOTALS = ['orders', 'spend', 'rating_sum', 'rating_count', 'cancellations']
+
+
+# Perfis parciais de um lote de pedidos: totais, primeiro/último pedido e atributos mais recentes
+def _partial_profiles(df):
+    key = df['customer_id']
+    totals = pd.DataFrame({
+        'orders': np.ones(len(df), dtype=np.int64),
+        'spend': df['price'],
+        'rating_sum': df['rating'].fillna(0),
+        'rating_count': df['rating'].notna().astype(np.int64),
+        'cancellations': df['delivery_status'].eq('Cancelled').astype(np.int64)
+    }).groupby(key, sort=False).sum()
+    # Pedidos em ordem de data: o primeiro e o último de cada cliente saem sem min/max em texto
+    ordered = df[['customer_id', 'order_date'] + CUSTOMER_ATTRIBUTES].take(
+        df['order_date'].argsort(kind='stable').to_numpy()
+    )
+    first = ordered.drop_duplicates('customer_id', keep='first').set_index('customer_id')
+    latest = ordered.drop_duplicates('customer_id', keep='last').set_index('customer_id')
+    return pd.concat([
+        latest[CUSTOMER_ATTRIBUTES].reindex(totals.index),
+        totals,
+        first['order_date'].rename('first_order'),
+        latest['order_date'].rename('last_order')
+    ], axis=1)
+
+
+# Colunas derivadas: avaliação média e dias desde o último pedido (referência: pedido mais recente)
+def _finish(profiles):
+    last_order = pd.to_datetime(profiles['last_order'])
+    return profiles.assign(
+        avg_rating=profiles['rating_sum'] / profiles['rating_count'].where(profiles['rating_count'] > 0),
+        recency_days=(last_order.max() - last_order).dt.days
+    )
+
+
+def build_profiles(df):
+    """Tabela de clientes (uma linha por customer_id) a partir dos pedidos"""
+    return _finish(_partial_profiles(df))
+
+
+def merge_profiles(old, new):
+    """Combina perfis de lotes diferentes de pedidos sem reler os pedidos antigos"""
+    columns = CUSTOMER_ATTRIBUTES + ORDER_TOTALS + ['first_order', 'last_order']
+    combined = pd.concat([old[columns], new[columns]])
+    merged = combined[ORDER_TOTALS].groupby(level=0, sort=False).sum()
+    first = combined.take(combined['first_order'].argsort(kind='stable').to_numpy())
+    first = first[~first.index.duplicated(keep='first')]
+    latest = combined.take(combined['last_order'].argsort(kind='stable').to_numpy())
+    latest = latest[~latest.index.duplicated(keep='last')]
+    return _finish(pd.concat([
+        latest[CUSTOMER_ATTRIBUTES].reindex(merged.index),
+        merged,
+        first['first_order'],
+        latest['last_order']
+    ], axis=1).rename_axis('customer_id'))
+
+
+class CustomerStore:
+    """Tabela de clientes materializada em disco e mantida de forma incremental.
+
+    O manifesto guarda o hash de cada arquivo já processado: partições novas são lidas
+    e combinadas aos perfis existentes; se algum arquivo mudou ou sumiu (ou o código
+    dos perfis ou do carregador mudou), a tabela é reconstruída.
+    Só a tabela do dataset inteiro é gravada (um diretório por dataset). Filtros que
+    selecionam todas as partições (o padrão do dashboard) usam essa mesma tabela; com os
+    demais filtros, os perfis dos pedidos filtrados são calculados em memória.
+    """
+
+    def __init__(self, path=DATASET_PATH, filters=None, root=CUSTOMER_DIR):
+        self.path = path
+        self.filters = filters
+        key = os.path.abspath(path)
+        self.directory = os.path.join(root, hashlib.blake2b(key.encode(), digest_size=16).hexdigest())
+
+    def _read_manifest(self):
+        manifest_path = os.path.join(self.directory, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    def _write(self, profiles, manifest):
+        # Gravação atômica: os perfis primeiro, o manifesto por último
+        os.makedirs(self.directory, exist_ok=True)
+        profiles_path = os.path.join(self.directory, 'profiles.pkl')
+        profiles.to_pickle(profiles_path + '.tmp')
+        os.replace(profiles_path + '.tmp', profiles_path)
+        manifest_path = os.path.join(self.directory, 'manifest.json')
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    # Os filtros só restringem colunas de partição presentes em todos os arquivos e nenhuma
+    # partição fica de fora: os pedidos são os mesmos do dataset inteiro
+    def _selects_all(self, files):
+        if not self.filters:
+            return True
+        return (all(column in values for _, values in files for column in self.filters)
+                and len(prune_partitions(files, self.filters)) == len(files))
+
+    def load(self, df=None):
+        """Perfis atualizados; `df` (o dataset já carregado) evita reler tudo numa reconstrução"""
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(self.path)
+        files = dataset_files(self.path)
+        if not self._selects_all(files):
+            return build_profiles(load_dataset(self.path, self.filters) if df is None else df)
+        digests = dict(zip([file_path for file_path, _ in files],
+                           file_digests([file_path for file_path, _ in files])))
+        version = code_version(build_profiles) + code_version(merge_profiles) + loader_version()
+        manifest = self._read_manifest()
+
+        if (manifest is not None and manifest['version'] == version
+                and all(digests.get(file_path) == digest for file_path, digest in manifest['files'].items())):
+            profiles = pd.read_pickle(os.path.join(self.directory, 'profiles.pkl'))
+            new_files = [(file_path, values) for file_path, values in files if file_path not in manifest['files']]
+            if not new_files:
+                return profiles
+            profiles = merge_profiles(profiles, build_profiles(load_files(new_files)))
+        else:
+            profiles = build_profiles(load_dataset(self.path) if df is None else df)
+
+        self._write(profiles, {'version': version, 'files': digests})
+        return profiles
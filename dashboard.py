@@ -4,6 +4,20 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+import os
+from customers import CustomerStore
+from data_store import SharedDataset, load_dataset, parse_dataset_args, partition_values
+from rankings import RankingEngine
+from report_cache import ReportCache
+import report_sections as sections
+from sampling import StratifiedSample, sample_size_for_budget
+from detail_table import DETAIL_COLUMNS, PAGE_SIZE, fetch_page, ordered_rows, page_count
+from indexes import INDEXED_COLUMNS
+from lookup import IndexStore, customer_drilldown, restaurant_drilldown
+from chart_cache import ChartCache
+from periods import DIMENSIONS, METRICS, PERIOD_COLUMNS
+from pricing_cube import PricingCube, dish_price_comparison, menu_mix, restaurant_revenue
+from anomalies import THRESHOLD, WINDOW, DailySeries, detect, series_detail
 
 # Configuração da página
 st.set_page_config(
@@ -13,27 +27,195 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Colunas dos filtros da barra lateral
+FILTER_COLUMNS = ('city', 'gender', 'age', 'payment_method', 'delivery_status')
+
+# Rankings calculados por aba: trocar de aba calcula só os rankings da aba escolhida
+RANKING_TABS = {
+    "📊 Por Volume": {
+        'top_categories': ('category', 'count', 5),
+        'top_cities_vol': ('city', 'count', 5),
+        'top_dishes_vol': ('dish_name', 'count', 10)
+    },
+    "💰 Por Receita": {
+        'top_age_revenue': ('age', 'revenue', 5),
+        'top_cities_revenue': ('city', 'revenue', 5),
+        'top_restaurants_revenue': ('restaurant_name', 'revenue', 10)
+    },
+    "🍽️ Produtos": {
+        'top_dishes_revenue': ('dish_name', 'revenue', 10),
+        'cat_volume': ('category', 'count', 5),
+        'cat_revenue': ('category', 'revenue', 5)
+    },
+    "📅 Temporal": {
+        'top_months': ('order_month', 'count', 5),
+        'top_months_revenue': ('order_month', 'revenue', 5)
+    }
+}
+
+# Visões do cubo restaurante x prato x cidade
+PRICING_VIEWS = ["💲 Preço por Prato", "🏙️ Cardápio por Cidade", "🏪 Receita por Restaurante"]
+
+# Nomes das dimensões da comparação entre períodos
+DIMENSION_LABELS = {
+    'city': 'Cidade',
+    'payment_method': 'Método de Pagamento',
+    'age': 'Faixa Etária',
+    'category': 'Categoria'
+}
+
+# Detecção de anomalias: granularidade -> (dias por ponto, pontos anteriores usados como referência)
+ANOMALY_GRANULARITIES = {"Dia": (1, WINDOW), "Semana": (7, 12)}
+ANOMALY_METRICS = {
+    'orders': 'Pedidos',
+    'revenue': 'Receita (R$)',
+    'cancellation_rate': 'Taxa de Cancelamento (%)',
+    'avg_rating': 'Avaliação Média'
+}
+ANOMALY_LEVELS = {
+    'city': 'Cidade',
+    'restaurant_name': 'Restaurante',
+    'city/restaurant_name': 'Cidade x Restaurante'
+}
+
+# Fonte dos dados: CSV único ou diretório particionado por ano/mês
+# (streamlit run dashboard.py -- --dataset <diretório>)
+DATASET, _ = parse_dataset_args()
+
 # Função para carregar os dados
-@st.cache_data
-def load_data():
-    df = pd.read_csv('manipulated_foodpanda_analysis_dataset.csv')
-    return df
+# cache_resource: uma única cópia do dataset compartilhada por todas as sessões.
+# `partitions` limita as partições lidas quando a fonte é um diretório particionado
+@st.cache_resource(max_entries=4)
+def load_data(partitions=()):
+    # Índices de busca persistidos em disco (.indexes/), reaproveitados entre reinícios
+    index_store = IndexStore(DATASET, dict(partitions))
+    df = load_dataset(DATASET, dict(partitions))
+    # Tabela de clientes materializada (.customers/), atualizada só com as partições novas
+    customers = CustomerStore(DATASET, dict(partitions)).load(df)
+    dataset = SharedDataset(df, index_store, customers)
+    # Opções dos filtros calculadas uma única vez, no carregamento
+    for column in FILTER_COLUMNS:
+        dataset.codes(column)
+    return dataset
+
+# Estatísticas de correlação do período carregado: as mesmas guardadas pelo data_analysis.py
+# no cache de relatórios (.report_cache/), calculadas só se ainda não estiverem lá
+@st.cache_data(max_entries=4)
+def load_correlations(partitions=()):
+    cache = ReportCache('data_analysis', DATASET, dict(partitions), df=load_data(partitions).df)
+    return cache.section(sections.correlation_stats)
+
+# Amostra estratificada do modo prévia, dimensionada pelo orçamento de latência
+@st.cache_resource(max_entries=4)
+def load_sample(budget_ms, partitions=()):
+    dataset = load_data(partitions)
+    return StratifiedSample(dataset, sample_size_for_budget(dataset, budget_ms))
+
+# Figuras dos gráficos já construídas, compartilhadas entre reexecuções e sessões
+@st.cache_resource
+def load_chart_cache():
+    return ChartCache()
 
 # Função para calcular métricas gerais
-def calculate_general_metrics(df):
+def calculate_general_metrics(view):
     metrics = {
-        'total_orders': len(df),
-        'unique_cities': df['city'].nunique(),
-        'unique_restaurants': df['restaurant_name'].nunique(),
-        'unique_dishes': df['dish_name'].nunique(),
-        'unique_categories': df['category'].nunique(),
-        'avg_rating': df['rating'].mean(),
-        'avg_order_frequency': df['order_frequency'].mean(),
-        'total_revenue': df['price'].sum(),
-        'avg_order_value': df['price'].mean()
+        'total_orders': view.total_rows,
+        'unique_cities': view.column('city').nunique(),
+        'unique_restaurants': view.column('restaurant_name').nunique(),
+        'unique_dishes': view.column('dish_name').nunique(),
+        'unique_categories': view.column('category').nunique(),
+        'avg_rating': view.mean('rating'),
+        'avg_order_frequency': view.mean('order_frequency'),
+        'total_revenue': view.total('price'),
+        'avg_order_value': view.mean('price')
     }
     return metrics
 
+# Função para as margens de erro (95%) das métricas no modo prévia
+def calculate_metric_cis(view, sample):
+    if sample is None:
+        return None, None, None
+    return (
+        sample.total_ci(view)[1],
+        sample.mean_ci(view, 'rating')[1],
+        sample.total_ci(view, 'price')[1]
+    )
+
+# Função para recalcular os dados de uma seção apenas quando as entradas declaradas mudam.
+# `inputs` identifica tudo de que a seção depende (partições, filtros, amostra, aba, ...);
+# o último resultado de cada seção fica na sessão do usuário.
+def section_data(name, inputs, compute):
+    key = f'section:{name}'
+    cached = st.session_state.get(key)
+    if cached is None or cached[0] != inputs:
+        cached = (inputs, compute())
+        st.session_state[key] = cached
+    return cached[1]
+
+# Função para médias por grupo (com intervalo de confiança de 95% no modo prévia)
+def group_mean(view, sample, key, value):
+    if sample is None:
+        return view.mean_by(key, value).sort_values(ascending=True), None
+    estimate = sample.mean_ci(view, value, by=key).sort_values('mean')
+    return estimate['mean'], estimate['ci']
+
+# Função para a taxa de cancelamento por faixa etária
+def calculate_cancellation_by_age(view, sample):
+    if sample is None:
+        age_status = view.frame(['age', 'delivery_status'])
+        cancellation_by_age = (
+            (age_status['delivery_status'] == 'Cancelled').groupby(age_status['age']).mean() * 100
+        ).sort_values(ascending=True)
+        return cancellation_by_age, None
+    cancelled = (sample.values('delivery_status') == 'Cancelled') * 100.0
+    cancellation_estimate = sample.mean_ci(view, cancelled, by='age').sort_values('mean')
+    return cancellation_estimate['mean'], cancellation_estimate['ci']
+
+# Função para o heatmap de correlação entre status de entrega e churned
+def calculate_status_churned(view):
+    status_churned = pd.crosstab(
+        view.column('delivery_status').to_numpy(),
+        view.column('churned').to_numpy(),
+        values=view.weights,
+        aggfunc='sum' if view.weights is not None else None,
+        normalize='columns'
+    ) * 100
+
+    # Renomear as colunas para melhor visualização
+    status_churned.columns = ['Ativo', 'Inativo']
+    return status_churned
+
+# Função para o resumo por cidade da tabela de dados detalhados
+def calculate_city_summary(view):
+    city_summary = view.frame(
+        ['city', 'rating', 'order_frequency', 'price', 'restaurant_name', 'category', 'payment_method']
+    ).groupby('city').agg({
+        'rating': 'mean',
+        'order_frequency': 'mean',
+        'price': ['sum', 'mean'],
+        'restaurant_name': lambda x: x.mode().iloc[0] if not x.mode().empty else 'N/A',
+        'category': lambda x: x.mode().iloc[0] if not x.mode().empty else 'N/A',
+        'payment_method': lambda x: x.mode().iloc[0] if not x.mode().empty else 'N/A'
+    }).round(2)
+
+    # Achatar as colunas multi-nível
+    city_summary.columns = ['Avaliação Média', 'Freq. Pedidos Média', 'Receita Total', 'Preço Médio', 
+                           'Restaurante Popular', 'Categoria Popular', 'Método Pagamento Popular']
+    return city_summary
+
+# Função para formatar um valor com a margem de erro da prévia
+def format_estimate(value, ci, fmt):
+    text = format(value, fmt)
+    return text if ci is None else f"{text} ± {format(ci, fmt)}"
+
+# Função para formatar valores numéricos e textos do drill-down
+def format_value(value):
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    if isinstance(value, (int, np.integer)):
+        return f"{value:,}"
+    return value
+
 # Função para criar rankings
 def create_ranking_chart(data, title, x_label, y_label, color_scheme='viridis'):
     """Cria gráfico de barras horizontais para rankings"""
@@ -53,8 +235,36 @@ def create_ranking_chart(data, title, x_label, y_label, color_scheme='viridis'):
     )
     return fig
 
-# Carregamento dos dados
-df = load_data()
+# Função para criar o gráfico de uma série com a mediana móvel e as anomalias destacadas
+def create_anomaly_chart(detail, title, y_label, threshold):
+    flagged = detail[detail['score'].abs() > threshold]
+    fig = px.line(
+        detail.rename(columns={'value': 'Valor', 'median': 'Mediana móvel'}).reset_index(),
+        x='date',
+        y=['Valor', 'Mediana móvel'],
+        title=title,
+        labels={'date': 'Data', 'value': y_label, 'variable': ''}
+    )
+    fig.add_scatter(x=flagged.index, y=flagged['value'], mode='markers', name='Anomalia',
+                    marker={'color': 'red', 'size': 9})
+    fig.update_layout(height=400)
+    return fig
+
+# Função para exibir um gráfico: a figura só é construída quando os dados (ou o tema) mudam
+def show_chart(chart_id, data, build):
+    theme = st.context.theme.type
+    st.plotly_chart(load_chart_cache().figure(chart_id, data, build, theme), use_container_width=True)
+
+# Carregamento dos dados: em um diretório particionado, só os anos/meses escolhidos são lidos
+partitions = ()
+if os.path.isdir(DATASET):
+    st.sidebar.header("Período")
+    year_options = partition_values(DATASET, 'order_year')
+    years = st.sidebar.multiselect("Selecione os Anos:", options=year_options, default=year_options)
+    month_options = partition_values(DATASET, 'order_month')
+    months = st.sidebar.multiselect("Selecione os Meses:", options=month_options, default=month_options)
+    partitions = (('order_year', tuple(years)), ('order_month', tuple(months)))
+dataset = load_data(partitions)
 
 # Título principal
 st.title("🍕 Dashboard Foodpanda - Análise de Dados")
@@ -66,75 +276,116 @@ st.sidebar.header("Filtros")
 # Filtros
 cities = st.sidebar.multiselect(
     "Selecione as Cidades:",
-    options=df['city'].unique(),
-    default=df['city'].unique()
+    options=dataset.options('city'),
+    default=dataset.options('city')
 )
 
 genders = st.sidebar.multiselect(
     "Selecione o Gênero:",
-    options=df['gender'].unique(),
-    default=df['gender'].unique()
+    options=dataset.options('gender'),
+    default=dataset.options('gender')
 )
 
 ages = st.sidebar.multiselect(
     "Selecione a Faixa Etária:",
-    options=df['age'].unique(),
-    default=df['age'].unique()
+    options=dataset.options('age'),
+    default=dataset.options('age')
 )
 
 payment_methods = st.sidebar.multiselect(
     "Selecione o Método de Pagamento:",
-    options=df['payment_method'].unique(),
-    default=df['payment_method'].unique()
+    options=dataset.options('payment_method'),
+    default=dataset.options('payment_method')
 )
 
 delivery_status = st.sidebar.multiselect(
     "Selecione o Status de Entrega:",
-    options=df['delivery_status'].unique(),
-    default=df['delivery_status'].unique()
+    options=dataset.options('delivery_status'),
+    default=dataset.options('delivery_status')
+)
+
+# Modo prévia: métricas e gráficos calculados sobre uma amostra estratificada
+st.sidebar.header("Modo Prévia")
+preview_mode = st.sidebar.toggle(
+    "Usar amostra estratificada",
+    value=False,
+    help="Responde a partir de uma amostra estratificada por cidade, faixa etária e status de entrega, com intervalos de confiança de 95%."
+)
+compute_exact = False
+budget_ms = None
+if preview_mode:
+    budget_ms = st.sidebar.select_slider(
+        "Orçamento de latência (ms):",
+        options=[50, 100, 250, 500, 1000],
+        value=250
+    )
+    compute_exact = st.sidebar.button("🎯 Calcular exato")
+
+# Aplicar filtros (visão por índices de linha, sem copiar as colunas)
+filters = dict(
+    city=cities,
+    gender=genders,
+    age=ages,
+    payment_method=payment_methods,
+    delivery_status=delivery_status
 )
+exact_view = dataset.select(**filters)
 
-# Aplicar filtros
-filtered_df = df[
-    (df['city'].isin(cities)) &
-    (df['gender'].isin(genders)) &
-    (df['age'].isin(ages)) &
-    (df['payment_method'].isin(payment_methods)) &
-    (df['delivery_status'].isin(delivery_status))
-]
+sample = None
+if preview_mode and not compute_exact:
+    sample = load_sample(budget_ms, partitions)
+    if sample.is_exact:
+        # A amostra cabe no orçamento com o dataset inteiro: não há o que estimar
+        sample = None
+filtered_view = exact_view if sample is None else sample.select(**filters)
+
+# Entradas declaradas das seções: as que usam só os dados exatos não mudam com o modo prévia
+exact_inputs = (partitions, tuple((column, tuple(selected)) for column, selected in filters.items()))
+view_inputs = exact_inputs + (None if sample is None else budget_ms,)
 
 # Verificar se há dados após filtros
-if filtered_df.empty:
+if exact_view.empty or filtered_view.empty:
     st.error("Nenhum dado encontrado com os filtros selecionados. Por favor, ajuste os filtros.")
     st.stop()
 
-# Calcular métricas
-metrics = calculate_general_metrics(filtered_df)
+# Calcular métricas (com as margens de erro de 95% no modo prévia)
+metrics, (orders_ci, rating_ci, revenue_ci) = section_data('metrics', view_inputs, lambda: (
+    calculate_general_metrics(filtered_view),
+    calculate_metric_cis(filtered_view, sample)
+))
 
 # Seção de Métricas Principais
 st.header("📊 Métricas Principais")
+if sample is not None:
+    st.caption(
+        f"🔍 Prévia: amostra estratificada de {len(sample):,} de {len(dataset):,} pedidos "
+        "(intervalos de confiança de 95%). Use **Calcular exato** na barra lateral para os valores exatos."
+    )
 col1, col2, col3, col4, col5 = st.columns(5)
 
 with col1:
-    st.metric("Total de Pedidos", f"{metrics['total_orders']:,}")
+    st.metric("Total de Pedidos", format_estimate(metrics['total_orders'], orders_ci, ',.0f'))
 with col2:
     st.metric("Cidades", metrics['unique_cities'])
 with col3:
     st.metric("Restaurantes", metrics['unique_restaurants'])
 with col4:
-    st.metric("Avaliação Média", f"{metrics['avg_rating']:.2f}")
+    st.metric("Avaliação Média", format_estimate(metrics['avg_rating'], rating_ci, '.2f'))
 with col5:
-    st.metric("Receita Total", f"R$ {metrics['total_revenue']:,.2f}")
+    st.metric("Receita Total", "R$ " + format_estimate(metrics['total_revenue'], revenue_ci, ',.2f'))
 
 st.markdown("---")
 
 # Seção de Análise por Cidade
 st.header("🏙️ Análise por Cidade")
+city_revenue, (city_rating, city_rating_ci) = section_data('city', view_inputs, lambda: (
+    filtered_view.sum_by('city', 'price').sort_values(ascending=True),
+    group_mean(filtered_view, sample, 'city', 'rating')
+))
 col1, col2 = st.columns(2)
 
 with col1:
-    city_revenue = filtered_df.groupby('city')['price'].sum().sort_values(ascending=True)
-    fig_city_revenue = px.bar(
+    show_chart('city_revenue', city_revenue, lambda: px.bar(
         x=city_revenue.values,
         y=city_revenue.index,
         orientation='h',
@@ -142,320 +393,560 @@ with col1:
         labels={'x': 'Receita (R$)', 'y': 'Cidade'},
         color=city_revenue.values,
         color_continuous_scale='Blues'
-    )
-    fig_city_revenue.update_layout(height=400, showlegend=False)
-    st.plotly_chart(fig_city_revenue, use_container_width=True)
+    ).update_layout(height=400, showlegend=False))
 
 with col2:
-    city_rating = filtered_df.groupby('city')['rating'].mean().sort_values(ascending=True)
-    fig_city_rating = px.bar(
+    show_chart('city_rating', (city_rating, city_rating_ci), lambda: px.bar(
         x=city_rating.values,
         y=city_rating.index,
+        error_x=city_rating_ci,
         orientation='h',
         title="Avaliação Média por Cidade",
         labels={'x': 'Avaliação Média', 'y': 'Cidade'},
         color=city_rating.values,
         color_continuous_scale='Greens'
-    )
-    fig_city_rating.update_layout(height=400, showlegend=False)
-    st.plotly_chart(fig_city_rating, use_container_width=True)
+    ).update_layout(height=400, showlegend=False))
 
 st.markdown("---")
 
 # Seção de Padrões de Pedidos
 st.header("📅 Padrões de Pedidos")
+monthly_orders, weekly_orders = section_data('patterns', view_inputs, lambda: (
+    filtered_view.count_by('order_month').sort_index(),
+    filtered_view.count_by('order_day_of_week').sort_index()
+))
 col1, col2 = st.columns(2)
 
 with col1:
-    monthly_orders = filtered_df.groupby('order_month').size().sort_index()
-    fig_monthly = px.line(
+    show_chart('monthly', monthly_orders, lambda: px.line(
         x=monthly_orders.index,
         y=monthly_orders.values,
         title="Pedidos por Mês",
         labels={'x': 'Mês', 'y': 'Número de Pedidos'},
         markers=True
-    )
-    fig_monthly.update_layout(height=400)
-    st.plotly_chart(fig_monthly, use_container_width=True)
+    ).update_layout(height=400))
 
 with col2:
-    weekly_orders = filtered_df.groupby('order_day_of_week').size()
-    fig_weekly = px.bar(
+    show_chart('weekly', weekly_orders, lambda: px.bar(
         x=weekly_orders.index,
         y=weekly_orders.values,
         title="Pedidos por Dia da Semana",
         labels={'x': 'Dia da Semana', 'y': 'Número de Pedidos'},
         color=weekly_orders.values,
         color_continuous_scale='Oranges'
-    )
-    fig_weekly.update_layout(height=400, showlegend=False)
-    st.plotly_chart(fig_weekly, use_container_width=True)
+    ).update_layout(height=400, showlegend=False))
 
 st.markdown("---")
 
 # Seção de Comportamento do Cliente
 st.header("👥 Comportamento do Cliente")
+(gender_spending, gender_spending_ci), payment_dist, (age_spending, age_spending_ci) = section_data(
+    'customers', view_inputs, lambda: (
+        group_mean(filtered_view, sample, 'gender', 'price'),
+        filtered_view.count_by('payment_method'),
+        group_mean(filtered_view, sample, 'age', 'price')
+    )
+)
+# Um cliente conta uma vez (tabela de clientes), não uma vez por pedido
+churned_status = section_data(
+    'churn', exact_inputs, lambda: exact_view.customers()['churned'].value_counts()
+)
 col1, col2 = st.columns(2)
 
 with col1:
-    gender_spending = filtered_df.groupby('gender')['price'].mean().sort_values(ascending=True)
-    fig_gender = px.bar(
+    show_chart('gender', (gender_spending, gender_spending_ci), lambda: px.bar(
         x=gender_spending.values,
         y=gender_spending.index,
+        error_x=gender_spending_ci,
         orientation='h',
         title="Gasto Médio por Gênero",
         labels={'x': 'Gasto Médio (R$)', 'y': 'Gênero'},
         color=gender_spending.values,
         color_continuous_scale='Purples'
-    )
-    fig_gender.update_layout(height=300, showlegend=False)
-    st.plotly_chart(fig_gender, use_container_width=True)
+    ).update_layout(height=300, showlegend=False))
 
 with col2:
-    payment_dist = filtered_df['payment_method'].value_counts()
-    fig_payment = px.pie(
+    show_chart('payment', payment_dist, lambda: px.pie(
         values=payment_dist.values,
         names=payment_dist.index,
         title="Distribuição dos Métodos de Pagamento"
-    )
-    fig_payment.update_layout(height=300)
-    st.plotly_chart(fig_payment, use_container_width=True)
+    ).update_layout(height=300))
 
 col3, col4 = st.columns(2)
 
 with col3:
-    churned_status = filtered_df['churned'].value_counts()
-    churned_labels = ['Ativo' if x == 0 else 'Inativo' for x in churned_status.index]
-    fig_status = px.pie(
+    churned_labels = ['Ativo' if x == 'Active' else 'Inativo' for x in churned_status.index]
+    show_chart('status', churned_status, lambda: px.pie(
         values=churned_status.values,
         names=churned_labels,
         title="Clientes Ativos vs Inativos"
-    )
-    fig_status.update_layout(height=300)
-    st.plotly_chart(fig_status, use_container_width=True)
+    ).update_layout(height=300))
 
 with col4:
-    age_spending = filtered_df.groupby('age')['price'].mean().sort_values(ascending=True)
-    fig_age = px.bar(
+    show_chart('age', (age_spending, age_spending_ci), lambda: px.bar(
         x=age_spending.values,
         y=age_spending.index,
+        error_x=age_spending_ci,
         orientation='h',
         title="Gasto Médio por Faixa Etária",
         labels={'x': 'Gasto Médio (R$)', 'y': 'Faixa Etária'},
         color=age_spending.values,
         color_continuous_scale='Reds'
-    )
-    fig_age.update_layout(height=300, showlegend=False)
-    st.plotly_chart(fig_age, use_container_width=True)
+    ).update_layout(height=300, showlegend=False))
 
 st.markdown("---")
 
 # Seção de Análise de Cancelamentos
 st.header("❌ Análise de Cancelamentos")
+(cancellation_by_age, cancellation_by_age_ci), status_churned = section_data(
+    'cancellations', view_inputs, lambda: (
+        calculate_cancellation_by_age(filtered_view, sample),
+        calculate_status_churned(filtered_view)
+    )
+)
 col1, col2 = st.columns(2)
 
 with col1:
-    # Taxa de cancelamento por faixa etária
-    cancellation_by_age = filtered_df.groupby('age').apply(
-        lambda x: (x['delivery_status'] == 'Cancelled').mean() * 100
-    ).sort_values(ascending=True)
-    
-    fig_cancel_age = px.bar(
+    show_chart('cancel_age', (cancellation_by_age, cancellation_by_age_ci), lambda: px.bar(
         x=cancellation_by_age.values,
         y=cancellation_by_age.index,
+        error_x=cancellation_by_age_ci,
         orientation='h',
         title="Taxa de Cancelamento por Faixa Etária (%)",
         labels={'x': 'Taxa de Cancelamento (%)', 'y': 'Faixa Etária'},
         color=cancellation_by_age.values,
         color_continuous_scale='Reds'
-    )
-    fig_cancel_age.update_layout(height=300, showlegend=False)
-    st.plotly_chart(fig_cancel_age, use_container_width=True)
+    ).update_layout(height=300, showlegend=False))
 
 with col2:
-    # Heatmap de correlação entre status de entrega e churned
-    status_churned = pd.crosstab(
-        filtered_df['delivery_status'], 
-        filtered_df['churned'], 
-        normalize='columns'
-    ) * 100
-    
-    # Renomear as colunas para melhor visualização
-    status_churned.columns = ['Ativo', 'Inativo']
-    
-    fig_heatmap = px.imshow(
+    show_chart('heatmap', status_churned, lambda: px.imshow(
         status_churned.values,
         x=status_churned.columns,
         y=status_churned.index,
         title="Relação Status de Entrega vs Inatividade (%)",
         color_continuous_scale='RdYlBu_r',
         text_auto=True
+    ).update_layout(height=300))
+
+st.markdown("---")
+
+# Seção de Comparação entre Períodos (com os filtros da barra lateral)
+st.header("📆 Comparação entre Períodos")
+
+# Fragmento: trocar os períodos ou a dimensão reexecuta só esta seção; os dois períodos
+# são agregados juntos, em uma passada por dimensão (periods.py)
+@st.fragment
+def comparison_section(dataset, view, inputs):
+    dates = sorted(dataset.options('order_date'))
+    granularity = st.radio("Comparar por:", ["Ano", "Mês", "Intervalo de datas"], horizontal=True)
+    col1, col2, col3 = st.columns(3)
+    if granularity == "Intervalo de datas":
+        # Padrão: primeira e segunda metades do período carregado
+        first, last = pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])
+        middle = first + (last - first) / 2
+        ranges = [
+            col.date_input(label, value=value, min_value=first.date(), max_value=last.date())
+            for col, label, value in (
+                (col1, "Período A:", (first.date(), middle.date())),
+                (col2, "Período B:", ((middle + pd.Timedelta(days=1)).date(), last.date()))
+            )
+        ]
+        if any(len(selected) != 2 for selected in ranges):
+            st.info("Selecione o início e o fim dos dois intervalos.")
+            return
+        periods = tuple(f"{start:%Y-%m-%d}:{end:%Y-%m-%d}" for start, end in ranges)
+    else:
+        size = 4 if granularity == "Ano" else 7
+        options = sorted({date[:size] for date in dates})
+        periods = (
+            col1.selectbox("Período A:", options, index=max(len(options) - 2, 0)),
+            col2.selectbox("Período B:", options, index=len(options) - 1)
+        )
+    dimension = col3.selectbox("Dimensão:", DIMENSIONS, format_func=DIMENSION_LABELS.get)
+    if periods[0] == periods[1]:
+        st.warning("Escolha dois períodos diferentes.")
+        return
+
+    comparison = section_data('comparison', (inputs, periods), lambda: sections.period_comparison(
+        view.frame(PERIOD_COLUMNS), periods
+    ))
+    base, other = periods
+    total = comparison['total'].iloc[0]
+    metric_cols = st.columns(len(METRICS))
+    for col, (metric, label, fmt) in zip(metric_cols, (
+        ('orders', "Pedidos", "{:,.0f}"),
+        ('revenue', "Receita", "R$ {:,.2f}"),
+        ('avg_price', "Ticket Médio", "R$ {:,.2f}"),
+        ('avg_rating', "Avaliação Média", "{:.2f}"),
+        ('cancellation_rate', "Taxa de Cancelamento", "{:.2f}%")
+    )):
+        delta = total[(metric, 'Δ')]
+        unit = " p.p." if metric == 'cancellation_rate' else "%"
+        col.metric(
+            label, fmt.format(total[(metric, other)]),
+            delta=None if pd.isna(delta) else f"{delta:+.2f}{unit}",
+            delta_color='inverse' if metric == 'cancellation_rate' else 'normal'
+        )
+    st.caption(f"Período B ({other}) em relação ao Período A ({base}).")
+
+    table = comparison[dimension]
+    chart_data = table['revenue'][[base, other]].rename_axis('group').reset_index().melt(
+        id_vars='group', var_name='Período', value_name='revenue'
     )
-    fig_heatmap.update_layout(height=300)
-    st.plotly_chart(fig_heatmap, use_container_width=True)
+    show_chart(('comparison', dimension), chart_data, lambda: px.bar(
+        chart_data, x='group', y='revenue', color='Período', barmode='group',
+        title=f"Receita por {DIMENSION_LABELS[dimension]}: {base} vs {other}",
+        labels={'group': DIMENSION_LABELS[dimension], 'revenue': 'Receita (R$)'}
+    ).update_layout(height=400))
+    st.dataframe(table.style.format("{:,.2f}", na_rep="-"), use_container_width=True)
+
+comparison_section(dataset, exact_view, exact_inputs)
+
+st.markdown("---")
+
+# Seção de Anomalias nas séries diárias por cidade e restaurante (com os filtros da barra lateral)
+st.header("🚨 Detecção de Anomalias")
+
+# Fragmento: trocar a granularidade, o limiar, a métrica ou a série reexecuta só esta seção;
+# as séries de todas as cidades e restaurantes são montadas e pontuadas juntas (anomalies.py)
+@st.fragment
+def anomaly_section(view, inputs):
+    col1, col2, col3 = st.columns(3)
+    granularity = col1.radio("Granularidade:", list(ANOMALY_GRANULARITIES), horizontal=True)
+    threshold = col2.select_slider("Limiar do z-score robusto:", options=[2.5, 3.0, 3.5, 4.0, 5.0],
+                                   value=THRESHOLD)
+    metric = col3.selectbox("Métrica:", list(ANOMALY_METRICS), format_func=ANOMALY_METRICS.get)
+    bucket_days, window = ANOMALY_GRANULARITIES[granularity]
+
+    daily = section_data('anomaly_series', (inputs, bucket_days), lambda: DailySeries.from_view(
+        view, bucket_days=bucket_days
+    ))
+    anomalies = section_data('anomalies', (inputs, bucket_days, threshold), lambda: detect(
+        daily, window, threshold
+    ))
+    flagged = anomalies[anomalies['metric'] == metric]
+    st.caption(f"{len(flagged):,} anomalias de {ANOMALY_METRICS[metric].lower()} em {len(daily):,} séries "
+               f"(mediana e MAD dos {window} pontos anteriores).")
+    if flagged.empty:
+        st.info("Nenhuma anomalia encontrada para esta métrica. Experimente a granularidade semanal ou um limiar menor.")
+        return
+
+    options = list(dict.fromkeys(zip(flagged['level'], flagged['series'])))
+    level, series = st.selectbox("Série:", options,
+                                 format_func=lambda option: f"{ANOMALY_LEVELS[option[0]]}: {option[1]}")
+    detail = series_detail(daily, level, series, metric, window)
+    show_chart(('anomaly', level, series, metric, bucket_days, threshold), detail, lambda: create_anomaly_chart(
+        detail, f"{ANOMALY_METRICS[metric]} - {series}", ANOMALY_METRICS[metric], threshold
+    ))
+
+    table = flagged.drop(columns='metric').head(50).assign(
+        level=lambda frame: frame['level'].map(ANOMALY_LEVELS),
+        date=lambda frame: frame['date'].dt.date
+    ).rename(columns={'level': 'Nível', 'series': 'Série', 'date': 'Data', 'value': 'Valor',
+                      'median': 'Mediana', 'score': 'Z-score'})
+    st.dataframe(table.style.format({'Valor': "{:,.2f}", 'Mediana': "{:,.2f}", 'Z-score': "{:+.2f}"}),
+                 use_container_width=True, hide_index=True)
+
+anomaly_section(filtered_view, view_inputs)
+
+st.markdown("---")
+
+# Seção de Correlação: matriz do dataset carregado (sem os filtros da barra lateral)
+st.header("🔗 Correlação entre Variáveis")
+# Fragmento: trocar o método reexecuta só esta seção
+@st.fragment
+def correlation_section(partitions):
+    method = st.radio("Método:", ["Pearson", "Spearman"], horizontal=True)
+    matrix = load_correlations(partitions)[method.lower()].correlation()
+    show_chart(('correlation', method), matrix, lambda: px.imshow(
+        matrix.values,
+        x=matrix.columns,
+        y=matrix.index,
+        title=f"Correlação de {method} entre Variáveis Numéricas e Codificadas",
+        color_continuous_scale='RdBu_r',
+        zmin=-1,
+        zmax=1,
+        text_auto='.2f'
+    ).update_layout(height=600))
+    st.caption("Calculada sobre todos os pedidos do período carregado, sem os filtros da barra lateral.")
+
+correlation_section(partitions)
 
 st.markdown("---")
 
 # NOVA SEÇÃO: Rankings e Top Performers
 st.header("🏆 Rankings e Top Performers")
 
-# Criar abas para diferentes tipos de rankings
-tab1, tab2, tab3, tab4 = st.tabs(["📊 Por Volume", "💰 Por Receita", "🍽️ Produtos", "📅 Temporal"])
-
-with tab1:
-    st.subheader("Rankings por Volume de Pedidos")
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Top categorias por volume
-        top_categories = filtered_df['category'].value_counts().head(5)
-        fig_cat_vol = create_ranking_chart(
-            top_categories, 
-            "Top 5 Categorias Mais Pedidas",
+# Rankings em um fragmento: trocar de aba reexecuta só esta seção e calcula só os rankings da aba
+# (uma agregação por coluna e seleção parcial do top-N)
+@st.fragment
+def rankings_section(view, inputs):
+    tab = st.segmented_control("Ranking:", list(RANKING_TABS), default=list(RANKING_TABS)[0],
+                               label_visibility='collapsed') or list(RANKING_TABS)[0]
+    rankings = section_data(f'rankings:{tab}', inputs, lambda: RankingEngine(view).compute(RANKING_TABS[tab]))
+
+    if tab == "📊 Por Volume":
+        st.subheader("Rankings por Volume de Pedidos")
+        col1, col2 = st.columns(2)
+
+        with col1:
+            # Top categorias por volume
+            top_categories = rankings['top_categories']
+            show_chart('cat_vol', top_categories, lambda: create_ranking_chart(
+                top_categories, 
+                "Top 5 Categorias Mais Pedidas",
+                "Número de Pedidos",
+                "Categoria",
+                'viridis'
+            ))
+
+        with col2:
+            # Top cidades por volume
+            top_cities_vol = rankings['top_cities_vol']
+            show_chart('cities_vol', top_cities_vol, lambda: create_ranking_chart(
+                top_cities_vol,
+                "Top 5 Cidades com Mais Pedidos",
+                "Número de Pedidos", 
+                "Cidade",
+                'plasma'
+            ))
+
+        # Top pratos por volume
+        st.subheader("Top 10 Pratos Mais Pedidos")
+        top_dishes_vol = rankings['top_dishes_vol']
+        show_chart('dishes_vol', top_dishes_vol, lambda: create_ranking_chart(
+            top_dishes_vol,
+            "Pratos Mais Populares por Volume",
             "Número de Pedidos",
-            "Categoria",
-            'viridis'
-        )
-        st.plotly_chart(fig_cat_vol, use_container_width=True)
-    
-    with col2:
-        # Top cidades por volume
-        top_cities_vol = filtered_df['city'].value_counts().head(5)
-        fig_cities_vol = create_ranking_chart(
-            top_cities_vol,
-            "Top 5 Cidades com Mais Pedidos",
-            "Número de Pedidos", 
-            "Cidade",
-            'plasma'
-        )
-        st.plotly_chart(fig_cities_vol, use_container_width=True)
-    
-    # Top pratos por volume
-    st.subheader("Top 10 Pratos Mais Pedidos")
-    top_dishes_vol = filtered_df['dish_name'].value_counts().head(10)
-    fig_dishes_vol = create_ranking_chart(
-        top_dishes_vol,
-        "Pratos Mais Populares por Volume",
-        "Número de Pedidos",
-        "Prato",
-        'cividis'
-    )
-    st.plotly_chart(fig_dishes_vol, use_container_width=True)
-
-with tab2:
-    st.subheader("Rankings por Receita Total")
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Top faixas etárias por receita
-        top_age_revenue = filtered_df.groupby('age')['price'].sum().sort_values(ascending=False).head(5)
-        fig_age_rev = create_ranking_chart(
-            top_age_revenue,
-            "Top Faixas Etárias por Receita",
+            "Prato",
+            'cividis'
+        ))
+
+    elif tab == "💰 Por Receita":
+        st.subheader("Rankings por Receita Total")
+        col1, col2 = st.columns(2)
+
+        with col1:
+            # Top faixas etárias por receita
+            top_age_revenue = rankings['top_age_revenue']
+            show_chart('age_rev', top_age_revenue, lambda: create_ranking_chart(
+                top_age_revenue,
+                "Top Faixas Etárias por Receita",
+                "Receita Total (R$)",
+                "Faixa Etária",
+                'blues'
+            ))
+
+        with col2:
+            # Top cidades por receita
+            top_cities_revenue = rankings['top_cities_revenue']
+            show_chart('cities_rev', top_cities_revenue, lambda: create_ranking_chart(
+                top_cities_revenue,
+                "Top 5 Cidades por Receita",
+                "Receita Total (R$)",
+                "Cidade", 
+                'greens'
+            ))
+
+        # Top restaurantes por receita
+        st.subheader("Top 10 Restaurantes por Receita")
+        top_restaurants_revenue = rankings['top_restaurants_revenue']
+        show_chart('rest_rev', top_restaurants_revenue, lambda: create_ranking_chart(
+            top_restaurants_revenue,
+            "Restaurantes com Maior Receita",
             "Receita Total (R$)",
-            "Faixa Etária",
-            'blues'
-        )
-        st.plotly_chart(fig_age_rev, use_container_width=True)
-    
-    with col2:
-        # Top cidades por receita
-        top_cities_revenue = filtered_df.groupby('city')['price'].sum().sort_values(ascending=False).head(5)
-        fig_cities_rev = create_ranking_chart(
-            top_cities_revenue,
-            "Top 5 Cidades por Receita",
+            "Restaurante",
+            'oranges'
+        ))
+
+    elif tab == "🍽️ Produtos":
+        st.subheader("Rankings de Produtos")
+
+        # Top pratos por receita
+        st.subheader("Top 10 Pratos por Receita")
+        top_dishes_revenue = rankings['top_dishes_revenue']
+        show_chart('dishes_rev', top_dishes_revenue, lambda: create_ranking_chart(
+            top_dishes_revenue,
+            "Pratos com Maior Receita",
             "Receita Total (R$)",
-            "Cidade", 
-            'greens'
-        )
-        st.plotly_chart(fig_cities_rev, use_container_width=True)
-    
-    # Top restaurantes por receita
-    st.subheader("Top 10 Restaurantes por Receita")
-    top_restaurants_revenue = filtered_df.groupby('restaurant_name')['price'].sum().sort_values(ascending=False).head(10)
-    fig_rest_rev = create_ranking_chart(
-        top_restaurants_revenue,
-        "Restaurantes com Maior Receita",
-        "Receita Total (R$)",
-        "Restaurante",
-        'oranges'
-    )
-    st.plotly_chart(fig_rest_rev, use_container_width=True)
-
-with tab3:
-    st.subheader("Rankings de Produtos")
-    
-    # Top pratos por receita
-    st.subheader("Top 10 Pratos por Receita")
-    top_dishes_revenue = filtered_df.groupby('dish_name')['price'].sum().sort_values(ascending=False).head(10)
-    fig_dishes_rev = create_ranking_chart(
-        top_dishes_revenue,
-        "Pratos com Maior Receita",
-        "Receita Total (R$)",
-        "Prato",
-        'reds'
-    )
-    st.plotly_chart(fig_dishes_rev, use_container_width=True)
-    
-    # Comparação volume vs receita para categorias
-    col1, col2 = st.columns(2)
-    with col1:
-        cat_volume = filtered_df['category'].value_counts().head(5)
-        fig_cat_comp1 = px.bar(
-            x=cat_volume.index,
-            y=cat_volume.values,
-            title="Categorias: Volume de Pedidos",
-            labels={'x': 'Categoria', 'y': 'Pedidos'},
-            color=cat_volume.values,
-            color_continuous_scale='viridis'
-        )
-        fig_cat_comp1.update_layout(height=400, showlegend=False)
-        st.plotly_chart(fig_cat_comp1, use_container_width=True)
-    
-    with col2:
-        cat_revenue = filtered_df.groupby('category')['price'].sum().sort_values(ascending=False).head(5)
-        fig_cat_comp2 = px.bar(
-            x=cat_revenue.index,
-            y=cat_revenue.values,
-            title="Categorias: Receita Total",
-            labels={'x': 'Categoria', 'y': 'Receita (R$)'},
-            color=cat_revenue.values,
-            color_continuous_scale='plasma'
-        )
-        fig_cat_comp2.update_layout(height=400, showlegend=False)
-        st.plotly_chart(fig_cat_comp2, use_container_width=True)
+            "Prato",
+            'reds'
+        ))
+
+        # Comparação volume vs receita para categorias
+        col1, col2 = st.columns(2)
+        with col1:
+            cat_volume = rankings['cat_volume']
+            show_chart('cat_comp1', cat_volume, lambda: px.bar(
+                x=cat_volume.index,
+                y=cat_volume.values,
+                title="Categorias: Volume de Pedidos",
+                labels={'x': 'Categoria', 'y': 'Pedidos'},
+                color=cat_volume.values,
+                color_continuous_scale='viridis'
+            ).update_layout(height=400, showlegend=False))
+
+        with col2:
+            cat_revenue = rankings['cat_revenue']
+            show_chart('cat_comp2', cat_revenue, lambda: px.bar(
+                x=cat_revenue.index,
+                y=cat_revenue.values,
+                title="Categorias: Receita Total",
+                labels={'x': 'Categoria', 'y': 'Receita (R$)'},
+                color=cat_revenue.values,
+                color_continuous_scale='plasma'
+            ).update_layout(height=400, showlegend=False))
+
+    elif tab == "📅 Temporal":
+        st.subheader("Rankings Temporais")
+        col1, col2 = st.columns(2)
+
+        with col1:
+            # Top meses por pedidos
+            top_months = rankings['top_months']
+            show_chart('months', top_months, lambda: px.bar(
+                x=top_months.index,
+                y=top_months.values,
+                title="Top 5 Meses com Mais Pedidos",
+                labels={'x': 'Mês', 'y': 'Número de Pedidos'},
+                color=top_months.values,
+                color_continuous_scale='turbo'
+            ).update_layout(height=400, showlegend=False))
+
+        with col2:
+            # Top meses por receita
+            top_months_revenue = rankings['top_months_revenue']
+            show_chart('months_rev', top_months_revenue, lambda: px.bar(
+                x=top_months_revenue.index,
+                y=top_months_revenue.values,
+                title="Top 5 Meses por Receita",
+                labels={'x': 'Mês', 'y': 'Receita (R$)'},
+                color=top_months_revenue.values,
+                color_continuous_scale='inferno'
+            ).update_layout(height=400, showlegend=False))
+
+rankings_section(filtered_view, view_inputs)
+
+st.markdown("---")
 
-with tab4:
-    st.subheader("Rankings Temporais")
-    col1, col2 = st.columns(2)
-    
+# Seção de Preços e Cardápio: cubo esparso restaurante x prato x cidade (pricing_cube.py)
+st.header("🧾 Preços e Cardápio")
+
+# Fragmento: trocar a visão ou o prato reexecuta só esta seção; o cubo é montado uma vez
+# por filtro e as visões são fatias e marginais dele, sem reagrupar os pedidos
+@st.fragment
+def pricing_section(view, inputs):
+    cube = section_data('pricing_cube', inputs, lambda: PricingCube.from_view(view))
+    choice = st.segmented_control("Visão:", PRICING_VIEWS, default=PRICING_VIEWS[0],
+                                  label_visibility='collapsed') or PRICING_VIEWS[0]
+
+    if choice == "💲 Preço por Prato":
+        dish = st.selectbox("Prato:", sorted(cube.marginal('dish_name').index))
+        prices = dish_price_comparison(cube, dish)
+        by_city = prices.drop(columns='Todas')
+        col1, col2 = st.columns(2)
+        with col1:
+            show_chart(('dish_price', dish), prices['Todas'], lambda: px.bar(
+                x=prices['Todas'].values,
+                y=prices.index,
+                orientation='h',
+                title=f"Preço Médio de {dish} por Restaurante",
+                labels={'x': 'Preço Médio (R$)', 'y': 'Restaurante'},
+                color=prices['Todas'].values,
+                color_continuous_scale='Tealgrn'
+            ).update_layout(height=400, showlegend=False))
+        with col2:
+            show_chart(('dish_price_city', dish), by_city, lambda: px.imshow(
+                by_city.values,
+                x=by_city.columns,
+                y=by_city.index,
+                title=f"Preço Médio de {dish} por Restaurante e Cidade",
+                labels={'x': 'Cidade', 'y': 'Restaurante', 'color': 'R$'},
+                color_continuous_scale='YlOrRd',
+                text_auto='.0f'
+            ).update_layout(height=400))
+
+    elif choice == "🏙️ Cardápio por Cidade":
+        mix = menu_mix(cube)
+        show_chart('menu_mix', mix, lambda: px.imshow(
+            mix.values,
+            x=mix.columns,
+            y=mix.index,
+            title="Participação de Cada Prato nos Pedidos da Cidade (%)",
+            labels={'x': 'Prato', 'y': 'Cidade', 'color': '%'},
+            color_continuous_scale='Blues',
+            text_auto='.1f'
+        ).update_layout(height=400))
+
+    else:
+        revenue = restaurant_revenue(cube)
+        by_city = revenue.drop(columns='Total').rename_axis(columns='city').stack().rename('revenue').reset_index()
+        show_chart('restaurant_revenue', revenue, lambda: px.bar(
+            by_city,
+            x='revenue',
+            y='restaurant_name',
+            color='city',
+            orientation='h',
+            title="Receita por Restaurante e Cidade",
+            labels={'revenue': 'Receita (R$)', 'restaurant_name': 'Restaurante', 'city': 'Cidade'}
+        ).update_layout(height=400, yaxis={'categoryorder': 'total ascending'}))
+
+    st.caption(f"{len(cube):,} combinações restaurante x prato x cidade com pedidos.")
+
+pricing_section(filtered_view, view_inputs)
+
+st.markdown("---")
+
+# Seção de Drill-down: busca direta no índice (sem varrer o dataset), ignorando os filtros
+st.header("🔎 Drill-down de Cliente e Restaurante")
+# Fragmento: buscar outro cliente/restaurante reexecuta só esta seção
+@st.fragment
+def drilldown_section(dataset):
+    col1, col2 = st.columns([1, 3])
     with col1:
-        # Top meses por pedidos
-        top_months = filtered_df['order_month'].value_counts().sort_values(ascending=False).head(5)
-        fig_months = px.bar(
-            x=top_months.index,
-            y=top_months.values,
-            title="Top 5 Meses com Mais Pedidos",
-            labels={'x': 'Mês', 'y': 'Número de Pedidos'},
-            color=top_months.values,
-            color_continuous_scale='turbo'
-        )
-        fig_months.update_layout(height=400, showlegend=False)
-        st.plotly_chart(fig_months, use_container_width=True)
-    
+        drill_type = st.radio("Buscar:", ["Cliente", "Restaurante"], horizontal=True)
     with col2:
-        # Top meses por receita
-        top_months_revenue = filtered_df.groupby('order_month')['price'].sum().sort_values(ascending=False).head(5)
-        fig_months_rev = px.bar(
-            x=top_months_revenue.index,
-            y=top_months_revenue.values,
-            title="Top 5 Meses por Receita",
-            labels={'x': 'Mês', 'y': 'Receita (R$)'},
-            color=top_months_revenue.values,
-            color_continuous_scale='inferno'
-        )
-        fig_months_rev.update_layout(height=400, showlegend=False)
-        st.plotly_chart(fig_months_rev, use_container_width=True)
+        if drill_type == "Cliente":
+            drill_value = st.text_input("ID do cliente (ex.: C5663):").strip()
+        else:
+            drill_value = st.text_input("Nome do restaurante (ex.: KFC):").strip()
+
+    if drill_value:
+        drill_column = 'customer_id' if drill_type == "Cliente" else 'restaurant_name'
+        drill_rows = dataset.index(drill_column).lookup(drill_value)
+        if len(drill_rows) == 0:
+            st.warning(f"Nenhum pedido encontrado para '{drill_value}'.")
+        else:
+            drill_orders = dataset.df.take(drill_rows)
+            if drill_type == "Cliente":
+                drill = customer_drilldown(drill_orders)
+            else:
+                drill = restaurant_drilldown(drill_orders)
+
+            summary_items = list(drill['summary'].items())
+            for start in range(0, len(summary_items), 5):
+                for col, (name, value) in zip(st.columns(5), summary_items[start:start + 5]):
+                    with col:
+                        st.metric(name, format_value(value))
+
+            if drill_type == "Restaurante":
+                col1, col2 = st.columns(2)
+                with col1:
+                    show_chart('drill_dishes', drill['dishes']['receita'], lambda: create_ranking_chart(
+                        drill['dishes']['receita'], "Receita por Prato", "Receita (R$)", "Prato", 'oranges'
+                    ))
+                with col2:
+                    show_chart('drill_cities', drill['cities']['pedidos'], lambda: create_ranking_chart(
+                        drill['cities']['pedidos'], "Pedidos por Cidade", "Número de Pedidos", "Cidade", 'blues'
+                    ))
+
+            st.subheader("Histórico de Pedidos")
+            recent_orders = drill['orders'][DETAIL_COLUMNS].iloc[::-1].head(PAGE_SIZE)
+            st.dataframe(recent_orders, use_container_width=True, hide_index=True)
+            if len(drill['orders']) > PAGE_SIZE:
+                st.caption(f"{PAGE_SIZE} pedidos mais recentes de {len(drill['orders']):,}")
+
+drilldown_section(dataset)
 
 st.markdown("---")
 
@@ -463,28 +954,42 @@ st.markdown("---")
 st.header("📋 Dados Detalhados")
 st.subheader("Estatísticas por Cidade")
 
-# Criar resumo por cidade
-city_summary = filtered_df.groupby('city').agg({
-    'rating': 'mean',
-    'order_frequency': 'mean',
-    'price': ['sum', 'mean'],
-    'restaurant_name': lambda x: x.mode().iloc[0] if not x.mode().empty else 'N/A',
-    'category': lambda x: x.mode().iloc[0] if not x.mode().empty else 'N/A',
-    'payment_method': lambda x: x.mode().iloc[0] if not x.mode().empty else 'N/A'
-}).round(2)
+# Criar resumo por cidade (recalculado só quando os filtros mudam)
+city_summary = section_data('city_summary', exact_inputs, lambda: calculate_city_summary(exact_view))
+st.dataframe(city_summary, use_container_width=True) # Revertendo para use_container_width=True para st.dataframe
 
-# Achatar as colunas multi-nível
-city_summary.columns = ['Avaliação Média', 'Freq. Pedidos Média', 'Receita Total', 'Preço Médio', 
-                       'Restaurante Popular', 'Categoria Popular', 'Método Pagamento Popular']
+# Tabela paginada: o servidor envia ao navegador apenas uma página por vez
+st.subheader("Pedidos Detalhados")
+# Fragmento: paginar, ordenar e buscar reexecutam só a tabela
+@st.fragment
+def detail_table_section(dataset, view, inputs):
+    col1, col2, col3, col4 = st.columns([2, 3, 2, 1])
+    with col1:
+        search_column = st.selectbox("Buscar por:", INDEXED_COLUMNS)
+    with col2:
+        search_text = st.text_input("Valor (ou início do valor):").strip()
+    with col3:
+        sort_by = st.selectbox("Ordenar por:", DETAIL_COLUMNS)
+    with col4:
+        ascending = st.toggle("Crescente", value=True)
+
+    detail_rows = section_data(
+        'detail_rows', (inputs, sort_by, ascending, search_column, search_text),
+        lambda: ordered_rows(view, sort_by, ascending, search_column, search_text)
+    )
+    total_pages = page_count(detail_rows)
+    page = st.number_input("Página:", min_value=1, max_value=total_pages, value=1, step=1)
+    st.dataframe(fetch_page(dataset, detail_rows, page), use_container_width=True, hide_index=True)
+    st.caption(f"{len(detail_rows):,} pedidos · página {page} de {total_pages} · {PAGE_SIZE} pedidos por página")
 
-st.dataframe(city_summary, use_container_width=True) # Revertendo para use_container_width=True para st.dataframe
+detail_table_section(dataset, exact_view, exact_inputs)
 
 # Opção para baixar os dados filtrados
 st.subheader("Download dos Dados Filtrados")
-csv = filtered_df.to_csv(index=False)
+# O CSV só é gerado quando o usuário clica no botão
 st.download_button(
     label="📥 Baixar dados filtrados como CSV",
-    data=csv,
+    data=lambda: exact_view.frame().to_csv(index=False),
     file_name='foodpanda_dados_filtrados.csv',
     mime='text/csv'
 )
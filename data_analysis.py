@@ -3,7 +3,17 @@ import numpy as np
 import plotly.express as px
 import seaborn as sns
 
-df = pd.read_csv('manipulated_foodpanda_analysis_dataset.csv')
+import report_sections as sections
+from customers import CustomerStore
+from data_store import parse_dataset_args
+from periods import parse_compare_args
+from report_cache import ReportCache
+
+# As seções são servidas do cache quando o dataset e o código não mudaram
+dataset_path, partition_filters = parse_dataset_args()
+compare_periods = parse_compare_args()  # --compare 2024 2025 (anos, meses AAAA-MM ou intervalos)
+cache = ReportCache('data_analysis', dataset_path, partition_filters)
+customers = CustomerStore(dataset_path, partition_filters)
 
 print('\n' + '=' * 50)
 print('\nANALYTICAL OVERVIEW OF THE MANIPULATED DATASET')
@@ -11,51 +21,62 @@ print('\nThis section provides an analytical overview of the manipulated dataset
 'information between various variables, with the aim of identifying relevant patterns and trends for data analysis.')
 print('\n' + '=' * 50)
 
+overview = cache.section(sections.dataset_overview)
 print("First 5 rows of the dataset:")
-print(df.head())
+print(overview['head'])
 print('-' * 50)
 print("\nName of Coolumns in the dataset:")
-print(df.columns)      
+print(overview['columns'])
 print('-' * 50)
 print("\nDataset Information:")
-print(df.info())
+print(overview['info'])
 print('-' * 50) 
 print("\nStatistical Summary:")
-print(df[['quantity',
-       'price', 'order_frequency', 'rating_date']].describe().to_string(float_format="%.2f")) 
+print(overview['describe'].to_string(float_format="%.2f")) 
 print('-' * 50)
-total_missing_values = df.isnull().sum().sum()
+total_missing_values = overview['total_missing_values']
 print(f"Total of Missing Values in the Dataset: {total_missing_values}")
 print('-' * 50)
 print("\nUnique Values in Each Column:")
-print(df.nunique())
+print(overview['nunique'])
 print('-' * 50)
 
 print('=' * 50)
 print("\nCORRELATIONAL ANALYSIS BETWEEN VARIABLES")
 print('\n' + '=' * 50)
 
+# Matrizes de correlação (Pearson e Spearman) das colunas numéricas e codificadas
+correlations = cache.section(sections.correlation_stats)
+for method, stats in correlations.items():
+    matrix = stats.correlation()
+    print(f"\n{method.capitalize()} correlation matrix:")
+    print(matrix.to_string(float_format="%.3f"))
+
+    # Pares de variáveis com a maior correlação absoluta
+    pairs = matrix.where(np.triu(np.ones(matrix.shape, dtype=bool), k=1)).stack()
+    strongest = pairs.reindex(pairs.abs().sort_values(ascending=False).index).head(5)
+    print(f"\nStrongest {method.capitalize()} correlations:")
+    for (first, second), value in strongest.items():
+        print(f"{first} x {second}: {value:.3f}")
+print('-' * 50)
+
 # 3. Use groupby() para uma análise por cidade
-city_summary = df.groupby('city').agg(
-    avg_rating=('rating', 'mean'),
-    avg_order_freq=('order_frequency', 'mean'),
-    total_amount_spent=('price', 'sum'),
-    avg_price_per_order=('price', 'mean'),
-    
-    # Para as colunas categóricas mais populares, usamos uma função lambda
-    most_popular_restaurant=('restaurant_name', lambda x: x.mode()[0]),
-    most_popular_category=('category', lambda x: x.mode()[0]),
-    most_popular_dish=('dish_name', lambda x: x.mode()[0]),
-    most_popular_payment_method=('payment_method', lambda x: x.mode()[0])
+city_summary = cache.section(sections.city_summary).drop(
+    columns=['num_restaurants', 'num_dishes', 'num_categories']
 )
 
 print("\nCONSOLIDATED STATISTICAL ANALYSIS BY CITY")
 print(city_summary) # Formata os floats para 2 casas decimais
+
+# Intervalos de confiança bootstrap (95%) das médias por grupo
+intervals = cache.section(sections.bootstrap_intervals)
+print("\nBootstrap 95% confidence intervals for the average rating by city:")
+print(intervals['rating_by_city'].round(2))
 print("="*50)
 
 # Análise do Padrão de Pedidos por Mês
 print("\nANALYSIS OF ORDER PATTERN BY MONTH")
-monthly_orders = df['order_month'].value_counts()
+monthly_orders = cache.section(sections.monthly_orders)
 print("\nMonthly Order Pattern:")
 print(monthly_orders)
 print('-'*50)
@@ -72,34 +93,36 @@ print(f"Difference: {monthly_orders[busiest_month] - monthly_orders[slowest_mont
 print('=' * 50)
 
 # Valor Médio gasto por Método de Pagamento
-payment_spent = df.groupby('payment_method')['price'].mean().sort_values(ascending=False)
+payment_spent = cache.section(sections.spend_by_payment_method)
 print("\nAVARAGE AMOUNT SPENT BY PAYMENT METHOD")    
 print(payment_spent.to_string(float_format="%.2f")) # Formata os floats para 2 casas decimais
+print("\nBootstrap 95% confidence intervals:")
+print(intervals['spend_by_payment_method'].to_string(float_format="%.2f"))
 print('='*50)
 
 # Média de gastos por genero
-genre_spent = df.groupby('gender')['price'].mean().sort_values(ascending=False)
+genre_spent = cache.section(sections.spend_by_gender)
 print("\nAVERAGE AMOUNT SPENT BY GENDER")    
 print(genre_spent.to_string(float_format="%.2f")) # Formata os floats para 2 casas decimais
+print("\nBootstrap 95% confidence intervals:")
+print(intervals['spend_by_gender'].to_string(float_format="%.2f"))
 print('='*50)
 
 # Stats by city
 print("\nANALYSIS BY AGE RANGE")
-ages = df['age'].unique()
-for age in ages:
-    age_data = df[df['age'] == age]
-    num_costumers = age_data['age'].value_counts().sum().sum()
-    num_dishes = age_data['dish_name'].nunique()
-    num_categories = age_data['category'].nunique()
-    avg_rating = age_data['rating'].mean()
-    avg_order_freq = age_data['order_frequency'].mean()
-    num_order_freq = age_data['order_frequency'].sum()
-    avg_price = age_data['price'].mean()
-    price_range = age_data['price'].sum()
-    num_churned_inactive = (age_data['churned'] == 'Inactive').sum()
-    num_chuerned_active = (age_data['churned'] == 'Active').sum()
-    payment_methods_city = age_data['payment_method'].value_counts()
-    num_cancellations = (age_data['delivery_status'] == 'Cancelled').sum()
+age_stats = cache.section(sections.age_stats)
+# Clientes contados uma vez cada (tabela de clientes), não uma vez por pedido
+age_customers = cache.section(sections.customers_by_age, customers.load).reindex(list(age_stats), fill_value=0)
+for age, stats in age_stats.items():
+    num_costumers = age_customers.loc[age, 'customers']
+    num_churned_inactive = age_customers.loc[age, 'inactive']
+    num_chuerned_active = age_customers.loc[age, 'active']
+    avg_rating = stats['avg_rating']
+    avg_order_freq = stats['avg_order_freq']
+    num_order_freq = stats['num_order_freq']
+    avg_price = stats['avg_price']
+    price_range = stats['total_spent']
+    num_cancellations = stats['num_cancellations']
     
     print(f"\nAge: {age}")
     print(f'Number of Costumers: {num_costumers}')
@@ -109,10 +132,10 @@ for age in ages:
     print(f"Average Order Frequency: {avg_order_freq:.0f} orders")
     print(f'Total Amount Spent: {price_range: ,.2f} currency units')
     print(f'Average Price per Order: {avg_price: ,.2f} currency units')
-    print('Principal Payment Methods: ', payment_methods_city.head(1).index[0])
-    print('Most Popular Restaurant: ', age_data["restaurant_name"].value_counts().head(1).index[0])
-    print(f'Most Popular Category: ', age_data["category"].value_counts().head(1).index[0])
-    print(f'Most Popular Dish: ', age_data["dish_name"].value_counts().head(1).index[0])
+    print('Principal Payment Methods: ', stats['top_payment_method'])
+    print('Most Popular Restaurant: ', stats['top_restaurant'])
+    print(f'Most Popular Category: ', stats['top_category'])
+    print(f'Most Popular Dish: ', stats['top_dish'])
     print(f'Total Number of Orders: {num_order_freq} orders')
     print(f'Number of Cancellations: {num_cancellations} cancellations')
    
@@ -124,35 +147,45 @@ print("\nRELATIONSHIP BETWEEN CANCELLED ORDERS AND INACTIVE CUSTOMERS")
 
 # Tabela cruzada entre delivery_status e churned
 # crosstab é usado para cruzar duas colunas da tabela e gerar uma vizualização mais clara e objetiva
-cross_tab = pd.crosstab(df['delivery_status'], df['churned'], margins=True)
+cancellation_churn = cache.section(sections.cancellation_churn)
+cross_tab = cancellation_churn['cross_tab']
 print("Cross-tabulation:")
 print(cross_tab)
 
 # Percentuais por linha (mostra a distribuição de churned para cada status)
-cross_tab_pct = pd.crosstab(df['delivery_status'], df['churned'], normalize='index') * 100
+cross_tab_pct = cancellation_churn['proportions'] * 100
 print(f"\nPercentages (%) by delivery status:")
 print(f'{cross_tab_pct.round(0)}')
 
+# Teste de significância da relação (qui-quadrado e V de Cramér)
+churn_test = cache.section(sections.cancellation_churn_test)
+print(f"\nChi-square test of independence (delivery status x churned):")
+print(f"Chi-square: {churn_test['chi2']:.2f} (dof = {churn_test['dof']})")
+print(f"p-value: {churn_test['p_value']:.4f}")
+print(f"Cramér's V: {churn_test['cramers_v']:.4f}")
+if churn_test['dof'] == 0:
+    print("Test skipped: the table needs at least two delivery statuses and two churn statuses.")
+elif churn_test['p_value'] < 0.05:
+    print("The relationship is statistically significant at the 5% level.")
+else:
+    print("The differences are not statistically significant at the 5% level (consistent with chance).")
+
 print('='*50)
 
 # Relação entre dias da semana e número de pedidos
 print("\nRELATIONSHIP DAYS AND ORDERS")
 
-# Usar o nome correto da coluna
-day_col = 'order_day_of_week'  # Ajuste conforme necessário
+day_analysis = cache.section(sections.orders_by_day)
 
 # Análise básica
-orders_by_day = df[day_col].value_counts()
+orders_by_day = day_analysis['orders_by_day']
 print("Orders by day of week:")
 print(orders_by_day.sort_index())
 
 # Identificar padrões
-weekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-weekends = ['Saturday', 'Sunday']
-
-if all(day in df[day_col].values for day in weekdays + weekends):
-    weekday_orders = df[df[day_col].isin(weekdays)].shape[0]
-    weekend_orders = df[df[day_col].isin(weekends)].shape[0]
+if day_analysis['weekday_orders'] is not None:
+    weekday_orders = day_analysis['weekday_orders']
+    weekend_orders = day_analysis['weekend_orders']
     
     print(f"\nWeekday vs Weekend Analysis:")
     print(f"Weekday orders (Mon-Fri): {weekday_orders:,}")
@@ -174,43 +207,21 @@ print('='*50)
 # Número de Cancelamentos por faixa etária
 print("\nCANCELLATIONS BY AGE RANGE")
 
-# Verificar se existe coluna de idade
-if 'age' in df.columns:
-    age_column = 'age'
-else:
-    # Verificar outros possíveis nomes de coluna de idade
-    possible_names = [col for col in df.columns if 'age' in col.lower()]
-    if possible_names:
-        age_column = possible_names[0]
-        print(f"Using column: {age_column}")
-    else:
-        print("No age column found!")
-        print('='*50)
-        exit()
-
-# Criar faixas etárias se necessário (caso a idade seja numérica)
-if df[age_column].dtype in ['int64', 'float64']:
-    # Criar bins de idade
-    df['age_range'] = pd.cut(df[age_column], 
-                            bins=[0, 18, 25, 35, 45, 55, 65, 100], 
-                            labels=['<18', '18-24', '25-34', '35-44', '45-54', '55-64', '65+'])
-    age_col_to_use = 'age_range'
-else:
-    age_col_to_use = age_column
+age_cancellations = cache.section(sections.cancellations_by_age)
 
 # Análise geral por faixa etária
-orders_by_age = df[age_col_to_use].value_counts().sort_index()
+orders_by_age = age_cancellations['orders_by_age']
 print("Total orders by age range:")
 print(orders_by_age)
 
 # Análise específica de cancelamentos
-cancelled_by_age = df[df['delivery_status'] == 'Cancelled'][age_col_to_use].value_counts().sort_index()
+cancelled_by_age = age_cancellations['cancelled_by_age']
 print(f"\nCancelled orders by age range:")
 print(cancelled_by_age)
 
 # Calcular taxa de cancelamento por faixa etária
 print(f"\nCancellation rate by age range:")
-total_orders = len(df)
+total_orders = age_cancellations['total_orders']
 
 for age_range in orders_by_age.index:
     if pd.notna(age_range):  # Verificar se não é NaN
@@ -223,6 +234,9 @@ for age_range in orders_by_age.index:
         print(f"  Cancelled orders: {cancelled_age_orders:,}")
         print(f"  Cancellation rate: {cancellation_rate:.2f}%")
 
+print(f"\nBootstrap 95% confidence intervals for the cancellation rate (%):")
+print(intervals['cancellation_rate_by_age'].round(2))
+
 # Identificar faixas etárias com maior e menor cancelamento
 if len(cancelled_by_age) > 0:
     highest_cancellation_age = cancelled_by_age.idxmax()
@@ -232,4 +246,14 @@ if len(cancelled_by_age) > 0:
     print(f"Highest cancellations: {highest_cancellation_age} ({cancelled_by_age[highest_cancellation_age]:,} orders)")
     print(f"Lowest cancellations: {lowest_cancellation_age} ({cancelled_by_age[lowest_cancellation_age]:,} orders)")
 
-print('='*50)
\ No newline at end of file
+print('='*50)
+
+# Comparação entre dois períodos (python data_analysis.py --compare 2024 2025)
+if compare_periods:
+    print("\nPERIOD-OVER-PERIOD COMPARISON")
+    comparison = cache.section(sections.period_comparison, periods=compare_periods)
+    print(f"{compare_periods[0]} vs {compare_periods[1]} (Δ in %, cancellation rate Δ in percentage points)")
+    for dimension, table in comparison.items():
+        print(f"\nBy {dimension.replace('_', ' ')}:")
+        print(table.to_string(float_format="%.2f"))
+    print('='*50)
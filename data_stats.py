@@ -1,38 +1,31 @@
 import pandas as pd
 
+import report_sections as sections
+from customers import CustomerStore
+from data_store import parse_dataset_args
+from report_cache import ReportCache
+
 pd.set_option('display.max_columns', None)  # Mostrar todas as colunas
 pd.set_option('display.width', None)        # Ajustar a largura do display
 
 
-# 1. Carregue o dataset
+# 1. Carregue o dataset (as seções são servidas do cache quando nada mudou)
+dataset_path, partition_filters = parse_dataset_args()
 try:
-    df = pd.read_csv('manipulated_foodpanda_analysis_dataset.csv')
+    cache = ReportCache('data_stats', dataset_path, partition_filters)
+    customers = CustomerStore(dataset_path, partition_filters)
 except FileNotFoundError:
-    print("Erro: O arquivo 'manipulated_foodpanda_analysis_dataset.csv' não foi encontrado.")
+    print(f"Erro: O arquivo '{dataset_path}' não foi encontrado.")
     exit()
 
 # 2. Análise Estatística Geral com describe()
 print("="*50)
 print("ANÁLISE ESTATÍSTICA DESCRITIVA GERAL")
-print(df.describe().to_string(float_format="%.2f"))  # Formata os floats para 2 casas decimais
+print(cache.section(sections.describe).to_string(float_format="%.2f"))  # Formata os floats para 2 casas decimais
 print("="*50)
 
 # 3. Use groupby() para uma análise por cidade
-city_summary = df.groupby('city').agg(
-    num_restaurants=('restaurant_name', 'nunique'),
-    num_dishes=('dish_name', 'nunique'),
-    num_categories=('category', 'nunique'),
-    avg_rating=('rating', 'mean'),
-    avg_order_freq=('order_frequency', 'mean'),
-    total_amount_spent=('price', 'sum'),
-    avg_price_per_order=('price', 'mean'),
-    
-    # Para as colunas categóricas mais populares, usamos uma função lambda
-    most_popular_restaurant=('restaurant_name', lambda x: x.mode()[0]),
-    most_popular_category=('category', lambda x: x.mode()[0]),
-    most_popular_dish=('dish_name', lambda x: x.mode()[0]),
-    most_popular_payment_method=('payment_method', lambda x: x.mode()[0])
-)
+city_summary = cache.section(sections.city_summary)
 
 # 4. Imprima o resultado de forma concisa e organizada
 print("\nANÁLISE ESTATÍSTICA CONSOLIDADA POR CIDADE")
@@ -40,37 +33,22 @@ print(city_summary.to_string(float_format="%.2f")) # Formata os floats para 2 ca
 
 # Valor médio de cada prato
 print("\nVALOR MÉDIO DE CADA PRATO")
-print(df.groupby('dish_name')['price'].mean().sort_values(ascending=False).to_string(float_format="%.2f")) # Formata os floats para 2 casas decimais
+print(cache.section(sections.dish_mean_price).to_string(float_format="%.2f")) # Formata os floats para 2 casas decimais
+
+# Preço médio do mesmo prato em cada restaurante
+print("\nPREÇO MÉDIO DE CADA PRATO POR RESTAURANTE")
+print(cache.section(sections.dish_price_by_restaurant).to_string(float_format="%.2f"))
 print('='*50)
 
 # Valor Médio de cada pedido
 print("\nVALOR MÉDIO DE CADA PEDIDO")
 
-# Calcule o valor médio de cada pedido e armazene em uma nova Série
-avg_order_price = df.groupby('order_id')['price'].mean()
-
-# Calcule os quartis (Q1, Q2 - Mediana, Q3)
-q1 = avg_order_price.quantile(0.25)
-median = avg_order_price.quantile(0.50)
-q3 = avg_order_price.quantile(0.75)
-
-# Crie faixas de preço usando a função categorize_price
-def categorize_price(price):
-    if price <= q1:
-        return 'Baixo (Q1)'
-    elif price <= median:
-        return 'Médio-Baixo (Q2)'
-    elif price <= q3:
-        return 'Médio-Alto (Q3)'
-    else:
-        return 'Alto (Q4)'
-
-# Crie uma nova Série com as categorias, uma para cada pedido único
-order_price_category = avg_order_price.apply(categorize_price)
-
-# Agrupe a Série de preços médios usando as novas categorias e calcule as estatísticas
-# O count() aqui será sobre o número de pedidos únicos
-price_summary = avg_order_price.groupby(order_price_category).agg(['mean', 'sum'])
+# Quartis (Q1, Q2 - Mediana, Q3) do valor médio de cada pedido e resumo por faixa de preço
+price_bands = cache.section(sections.order_price_bands)
+q1 = price_bands['q1']
+median = price_bands['median']
+q3 = price_bands['q3']
+price_summary = price_bands['summary']
 
 print("\nRESUMO CORRIGIDO DO NÚMERO DE PEDIDOS POR FAIXA DE PREÇO:")
 print(f"\nDetalhes das Faixas de Preço:")
@@ -83,38 +61,37 @@ print(price_summary.to_string(float_format="%.2f"))
 print('='*50)
 
 # Valor Médio gasto por Faixa Etária
-age_spent = df.groupby('age')['price'].mean().sort_values(ascending=False)
-print("\nVALOR MÉDIO GASTO POR FAIXA ETÁRIA")       
+age_spent = cache.section(sections.spend_by_age)
+print("\nVALOR MÉDIO GASTO POR FAIXA ETÁRIA")
 print(age_spent.to_string(float_format="%.2f")) # Formata os floats para 2 casas decimais
 print('='*50)
 
 # Número de Operações por Método de Pagamento
 print("\nFREQUÊNCIA DOS MÉTODOS DE PAGAMENTO")
-print(df['payment_method'].value_counts())
+print(cache.section(sections.payment_counts))
 print('='*50)
 
-# Numero de Clientes ativos vs Inativos
+# Numero de Clientes ativos vs Inativos (contados na tabela de clientes)
 print("\nNÚMERO DE CLIENTES ATIVOS VS INATIVOS")
-print(df['churned'].value_counts()) 
-print('='*50)   
+print(cache.section(sections.churn_counts, customers.load))
+print('='*50)
 
 # Relação entre status do pedido e clientes inativos
 print("\nRELATIONSHIP BETWEEN CANCELLED ORDERS AND INACTIVE CUSTOMERS")
+cancellation_churn = cache.section(sections.cancellation_churn)
 
-# Criar tabela de contingência
-contingency_table = pd.crosstab(df['delivery_status'], df['churned'])
+# Tabela de contingência
 print("Contingency Table:")
-print(contingency_table)
+print(cancellation_churn['contingency_table'])
 
-# Calcular proporções
+# Proporções
 print(f"\nProportions:")
-proportions = contingency_table.div(contingency_table.sum(axis=1), axis=0)
-print(proportions.round(4))
+print(cancellation_churn['proportions'].round(4))
 
 # Foco nos cancelamentos
-cancelled_inactive = len(df[(df['delivery_status'] == 'Cancelled') & (df['churned'] == 'Inactive')])
-total_cancelled = len(df[df['delivery_status'] == 'Cancelled'])
-total_inactive = len(df[df['churned'] == 'Inactive'])
+cancelled_inactive = cancellation_churn['cancelled_inactive']
+total_cancelled = cancellation_churn['total_cancelled']
+total_inactive = cancellation_churn['total_inactive']
 
 print(f"\nKey Metrics:")
 print(f"Total cancelled orders: {total_cancelled}")
@@ -122,39 +99,36 @@ print(f"Cancelled orders with inactive customers: {cancelled_inactive}")
 print(f"% of cancelled orders that are inactive: {(cancelled_inactive/total_cancelled)*100:.2f}%")
 print(f"% of inactive customers with cancelled orders: {(cancelled_inactive/total_inactive)*100:.2f}%")
 
+# Teste de significância da relação (qui-quadrado e V de Cramér)
+churn_test = cache.section(sections.cancellation_churn_test)
+print(f"\nChi-square test of independence (delivery status x churned):")
+print(f"Chi-square: {churn_test['chi2']:.2f} (dof = {churn_test['dof']})")
+print(f"p-value: {churn_test['p_value']:.4f}")
+print(f"Cramér's V: {churn_test['cramers_v']:.4f}")
+if churn_test['dof'] == 0:
+    print("Test skipped: the table needs at least two delivery statuses and two churn statuses.")
+elif churn_test['p_value'] < 0.05:
+    print("The relationship is statistically significant at the 5% level.")
+else:
+    print("The differences are not statistically significant at the 5% level (consistent with chance).")
+
 print('='*50)
 
 # Relação entre dias da semana e número de pedidos
 print("\nRELATIONSHIP DAYS AND ORDERS")
-
-# Definir a ordem dos dias da semana
-day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-
-# Contar pedidos por dia da semana (ordenado)
-if 'order_day_of_week' in df.columns:
-    day_column = 'order_day_of_week'
-else:
-    # Verificar outros possíveis nomes de coluna
-    possible_names = [col for col in df.columns if 'day' in col.lower()]
-    if possible_names:
-        day_column = possible_names[0]
-        print(f"Using column: {day_column}")
-    else:
-        print("No day column found!")
-        print('='*50)
-        exit()
+day_analysis = cache.section(sections.orders_by_day)
 
 # Reindexar para manter a ordem dos dias
-orders_by_day = df[day_column].value_counts()
-if all(day in orders_by_day.index for day in day_order):
-    orders_by_day = orders_by_day.reindex(day_order)
+orders_by_day = day_analysis['orders_by_day']
+if all(day in orders_by_day.index for day in sections.DAY_ORDER):
+    orders_by_day = orders_by_day.reindex(sections.DAY_ORDER)
 
 print("Orders by day of week:")
 print(orders_by_day)
 
 # Análise detalhada
 print(f"\nDetailed Analysis:")
-total_orders = len(df)
+total_orders = day_analysis['total_orders']
 
 for day in orders_by_day.index:
     count = orders_by_day[day]
@@ -174,30 +148,23 @@ for day in orders_by_day.index:
 
 # Análise por status de entrega (se desejado)
 print(f"\nOrders by day and delivery status:")
-day_status_analysis = pd.crosstab(df[day_column], df['delivery_status'], margins=True)
-print(day_status_analysis)
+print(day_analysis['day_status'])
 
 print('='*50)
 
 # Relação entre dias da semana e número de pedidos
 print("\nRELATIONSHIP DAYS AND ORDERS")
 
-# Usar o nome correto da coluna
-day_col = 'order_day_of_week'  # Ajuste conforme necessário
-
 # Análise básica
-orders_by_day = df[day_col].value_counts()
+orders_by_day = day_analysis['orders_by_day']
 print("Orders by day of week:")
 print(orders_by_day.sort_index())
 
 # Identificar padrões
-weekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-weekends = ['Saturday', 'Sunday']
+if day_analysis['weekday_orders'] is not None:
+    weekday_orders = day_analysis['weekday_orders']
+    weekend_orders = day_analysis['weekend_orders']
 
-if all(day in df[day_col].values for day in weekdays + weekends):
-    weekday_orders = df[df[day_col].isin(weekdays)].shape[0]
-    weekend_orders = df[df[day_col].isin(weekends)].shape[0]
-    
     print(f"\nWeekday vs Weekend Analysis:")
     print(f"Weekday orders (Mon-Fri): {weekday_orders:,}")
     print(f"Weekend orders (Sat-Sun): {weekend_orders:,}")
@@ -216,58 +183,35 @@ print(f"Difference: {orders_by_day[busiest_day] - orders_by_day[slowest_day]:,}
 print('='*50)
 # Número de Cancelamentos por faixa etária
 print("\nCANCELLATIONS BY AGE RANGE")
-
-# Verificar se existe coluna de idade
-if 'age' in df.columns:
-    age_column = 'age'
-else:
-    # Verificar outros possíveis nomes de coluna de idade
-    possible_names = [col for col in df.columns if 'age' in col.lower()]
-    if possible_names:
-        age_column = possible_names[0]
-        print(f"Using column: {age_column}")
-    else:
-        print("No age column found!")
-        print('='*50)
-        exit()
-
-# Criar faixas etárias se necessário (caso a idade seja numérica)
-if df[age_column].dtype in ['int64', 'float64']:
-    # Criar bins de idade
-    df['age_range'] = pd.cut(df[age_column], 
-                            bins=[0, 18, 25, 35, 45, 55, 65, 100], 
-                            labels=['<18', '18-24', '25-34', '35-44', '45-54', '55-64', '65+'])
-    age_col_to_use = 'age_range'
-else:
-    age_col_to_use = age_column
+age_cancellations = cache.section(sections.cancellations_by_age)
 
 # Análise geral por faixa etária
-orders_by_age = df[age_col_to_use].value_counts().sort_index()
+orders_by_age = age_cancellations['orders_by_age']
 print("Total orders by age range:")
 print(orders_by_age)
 
 # Análise específica de cancelamentos
-cancelled_by_age = df[df['delivery_status'] == 'Cancelled'][age_col_to_use].value_counts().sort_index()
+cancelled_by_age = age_cancellations['cancelled_by_age']
 print(f"\nCancelled orders by age range:")
 print(cancelled_by_age)
 
 # Calcular taxa de cancelamento por faixa etária
 print(f"\nCancellation rate by age range:")
-total_orders = len(df)
+total_orders = age_cancellations['total_orders']
 
 for age_range in orders_by_age.index:
     if pd.notna(age_range):  # Verificar se não é NaN
         total_age_orders = orders_by_age[age_range]
         cancelled_age_orders = cancelled_by_age.get(age_range, 0)
         cancellation_rate = (cancelled_age_orders / total_age_orders) * 100
-        
+
         print(f"{age_range}:")
         print(f"  Total orders: {total_age_orders:,}")
         print(f"  Cancelled orders: {cancelled_age_orders:,}")
         print(f"  Cancellation rate: {cancellation_rate:.2f}%")
 
 # Comparação com taxa média de cancelamento
-total_cancelled = len(df[df['delivery_status'] == 'Cancelled'])
+total_cancelled = age_cancellations['total_cancelled']
 overall_cancellation_rate = (total_cancelled / total_orders) * 100
 
 print(f"\nComparison with overall cancellation rate ({overall_cancellation_rate:.2f}%):")
@@ -276,30 +220,32 @@ for age_range in orders_by_age.index:
         total_age_orders = orders_by_age[age_range]
         cancelled_age_orders = cancelled_by_age.get(age_range, 0)
         age_cancellation_rate = (cancelled_age_orders / total_age_orders) * 100
-        
+
         diff = age_cancellation_rate - overall_cancellation_rate
         if diff > 0:
             print(f"{age_range}: +{diff:.2f}% above average")
         else:
             print(f"{age_range}: {diff:.2f}% below average")
 
+# Intervalo de confiança bootstrap (95%) da taxa de cancelamento
+print(f"\nBootstrap 95% confidence intervals for the cancellation rate (%):")
+print(cache.section(sections.bootstrap_intervals)['cancellation_rate_by_age'].round(2))
+
 # Identificar faixas etárias com maior e menor cancelamento
 if len(cancelled_by_age) > 0:
     highest_cancellation_age = cancelled_by_age.idxmax()
     lowest_cancellation_age = cancelled_by_age.idxmin()
-    
+
     print(f"\nAge Range Performance:")
     print(f"Highest cancellations: {highest_cancellation_age} ({cancelled_by_age[highest_cancellation_age]:,} orders)")
     print(f"Lowest cancellations: {lowest_cancellation_age} ({cancelled_by_age[lowest_cancellation_age]:,} orders)")
 
 # Análise completa por status de entrega
 print(f"\nComplete analysis by age and delivery status:")
-age_status_crosstab = pd.crosstab(df[age_col_to_use], df['delivery_status'], margins=True)
-print(age_status_crosstab)
+print(age_cancellations['age_status'])
 
 # Percentual por faixa etária
 print(f"\nPercentage distribution by delivery status within each age range:")
-age_status_pct = pd.crosstab(df[age_col_to_use], df['delivery_status'], normalize='index') * 100
-print(age_status_pct.round(2))
+print(age_cancellations['age_status_pct'].round(2))
 
-print('='*50)
\ No newline at end of file
+print('='*50)
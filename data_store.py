@@ -0,0 +1,335 @@
+import argparse
+import hashlib
+import inspect
+import os
+
+import numpy as np
+import pandas as pd
+
+import ingest
+import validation
+from indexes import ColumnIndex
+from ingest import CHUNK_ROWS, SCHEMA, read_csv, read_csv_chunks
+from validation import validate
+
+DATASET_PATH = 'manipulated_foodpanda_analysis_dataset.csv'
+
+# Ordem das colunas do dataset
+COLUMNS = list(SCHEMA)
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December']
+
+# Colunas que podem aparecer no caminho de um dataset particionado (estilo hive):
+# <raiz>/order_year=2024/order_month=August[/city=Lahore]/<arquivo>.csv
+PARTITION_COLUMNS = ('order_year', 'order_month', 'city')
+PARTITION_FILE_SUFFIXES = ('.csv', '.csv.gz', '.csv.zst')
+
+
+# Lista os arquivos de um dataset particionado com os valores das partições de cada um
+def list_partitions(root):
+    partitions = []
+    for directory, _, files in os.walk(root):
+        values = {}
+        for part in os.path.relpath(directory, root).split(os.sep):
+            key, sep, value = part.partition('=')
+            if sep and key in PARTITION_COLUMNS:
+                values[key] = value
+        for file_name in sorted(files):
+            if file_name.endswith(PARTITION_FILE_SUFFIXES):
+                partitions.append((os.path.join(directory, file_name), values))
+    return sorted(partitions, key=lambda partition: partition[0])
+
+
+# Mantém só as partições compatíveis com os filtros ({coluna: valores aceitos})
+def prune_partitions(partitions, filters=None):
+    filters = {column: {str(value) for value in values} for column, values in (filters or {}).items()}
+    return [
+        (path, values) for path, values in partitions
+        if all(values[column] in allowed for column, allowed in filters.items() if column in values)
+    ]
+
+
+# Valores existentes de uma coluna de partição (sem ler os arquivos)
+def partition_values(root, column):
+    values = {values[column] for _, values in list_partitions(root) if column in values}
+    if column == 'order_month':
+        return [month for month in MONTH_ORDER if month in values]
+    return sorted(values)
+
+
+def dataset_files(path=DATASET_PATH, filters=None):
+    """Arquivos que precisam ser lidos para os filtros (o próprio arquivo, se não for um diretório)"""
+    if os.path.isdir(path):
+        return prune_partitions(list_partitions(path), filters)
+    return [(path, {})]
+
+
+# Função para carregar o dataset base
+def load_dataset(path=DATASET_PATH, filters=None, engine='auto'):
+    """Carrega um CSV (compactado ou não) ou um diretório particionado.
+
+    `filters` ({coluna: valores}) restringe as colunas de partição: em um diretório, só as
+    partições compatíveis são lidas; em um CSV único, as linhas são filtradas após a leitura.
+    `engine` escolhe o leitor de ingest.py ('auto', 'pyarrow' ou 'pandas').
+    """
+    return load_files(dataset_files(path, filters), filters, engine)
+
+
+# Colunas de partição ficam no caminho, não no arquivo
+def _add_partition_columns(frame, values):
+    for column, value in values.items():
+        if column not in frame.columns:
+            frame[column] = int(value) if column == 'order_year' else value
+    return frame
+
+
+# Ordem padrão das colunas e filtros de partição aplicados às linhas
+def _finish_frame(df, filters=None):
+    if set(COLUMNS) <= set(df.columns):
+        df = df[COLUMNS + [column for column in df.columns if column not in COLUMNS]]
+    for column, values in (filters or {}).items():
+        if column in df.columns:
+            df = df[df[column].astype(str).isin([str(value) for value in values])]
+    return df.reset_index(drop=True)
+
+
+# Lê uma lista de arquivos de dataset_files(), valida cada arquivo (validation.py) e aplica
+# os filtros de partição às linhas
+def load_files(files, filters=None, engine='auto'):
+    frames = [validate(_add_partition_columns(read_csv(file_path, engine), values), file_path, remember=True)
+              for file_path, values in files]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    return _finish_frame(df, filters)
+
+
+def iter_file_chunks(file_path, values=None, filters=None, engine='auto', chunk_rows=CHUNK_ROWS):
+    """Blocos de um arquivo de dataset_files(), já validados e com as colunas de partição e os filtros"""
+    for i, chunk in enumerate(read_csv_chunks(file_path, engine, chunk_rows)):
+        chunk = validate(_add_partition_columns(chunk, values or {}), file_path, append=i > 0)
+        yield _finish_frame(chunk, filters)
+
+
+def iter_chunks(path=DATASET_PATH, filters=None, engine='auto', chunk_rows=CHUNK_ROWS):
+    """Percorre o dataset em blocos (streaming), sem carregá-lo inteiro na memória"""
+    for file_path, values in dataset_files(path, filters):
+        yield from iter_file_chunks(file_path, values, filters, engine, chunk_rows)
+
+
+# Hash do carregador (loader_version), calculado uma vez por processo
+_loader_version = None
+
+
+# Versão do carregador: hash do código de leitura (ingest.py), da validação (validation.py, com as
+# tabelas de regras) e das etapas de load_files. Entra nas chaves de tudo que é persistido a partir
+# das linhas carregadas (cache de relatórios, índices, perfis de clientes), porque as linhas que
+# entram na carga e as suas posições dependem desse código, não só do conteúdo dos arquivos
+def loader_version():
+    global _loader_version
+    if _loader_version is None:
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (ingest, validation, load_files, iter_file_chunks, _add_partition_columns, _finish_frame):
+            digest.update(inspect.getsource(part).encode())
+        _loader_version = digest.hexdigest()
+    return _loader_version
+
+
+# Grava o dataset particionado por ano/mês do pedido (e opcionalmente cidade)
+def write_partitions(df, root, columns=('order_year', 'order_month')):
+    for keys, partition in df.groupby(list(columns), sort=False):
+        directory = os.path.join(root, *[f'{column}={value}' for column, value in zip(columns, keys)])
+        os.makedirs(directory, exist_ok=True)
+        partition.drop(columns=list(columns)).to_csv(os.path.join(directory, 'part-0.csv'), index=False)
+
+
+# Argumentos de linha de comando comuns aos scripts (dataset e filtros de partição)
+def add_dataset_arguments(parser):
+    parser.add_argument('--dataset', default=DATASET_PATH,
+                        help='CSV ou diretório particionado (order_year=/order_month=/[city=/])')
+    parser.add_argument('--year', nargs='+', help='Anos dos pedidos (order_year)')
+    parser.add_argument('--month', nargs='+', help='Meses dos pedidos (order_month)')
+    parser.add_argument('--city', nargs='+', help='Cidades')
+    return parser
+
+
+def dataset_filters(args):
+    return {column: values for column, values in
+            (('order_year', args.year), ('order_month', args.month), ('city', args.city)) if values}
+
+
+def parse_dataset_args(description=None, argv=None):
+    parser = add_dataset_arguments(argparse.ArgumentParser(description=description))
+    args, _ = parser.parse_known_args(argv)
+    return args.dataset, dataset_filters(args)
+
+
+class SharedDataset:
+    """Dataset base mantido uma única vez em memória e compartilhado entre sessões.
+
+    O DataFrame base nunca deve ser modificado; as sessões acessam os dados por DatasetView.
+    """
+
+    def __init__(self, df, index_store=None, customers=None):
+        self.df = df
+        self.index_store = index_store  # lookup.IndexStore: índices persistidos em disco
+        self.customers = customers  # customers.py: perfis por customer_id
+        self._customer_profiles = None
+        self._codes = {}
+        self._sort_orders = {}
+        self._indexes = {}
+
+    def __len__(self):
+        return len(self.df)
+
+    def codes(self, column):
+        # Códigos inteiros por coluna (calculados uma vez) para filtrar sem comparar strings
+        if column not in self._codes:
+            codes, uniques = pd.factorize(self.df[column])
+            codes.flags.writeable = False
+            self._codes[column] = (codes, uniques)
+        return self._codes[column]
+
+    def options(self, column):
+        return list(self.codes(column)[1])
+
+    def sort_order(self, column):
+        # Ordem das linhas por coluna (calculada uma vez), usada para ordenar sem novo sort
+        if column not in self._sort_orders:
+            values = self.df[column]
+            if pd.api.types.is_numeric_dtype(values):
+                order = np.argsort(values.to_numpy(), kind='stable')
+            else:
+                codes = pd.factorize(values, sort=True)[0]
+                order = np.argsort(codes, kind='stable')
+            order.flags.writeable = False
+            self._sort_orders[column] = order
+        return self._sort_orders[column]
+
+    def index(self, column):
+        # Índice de busca por coluna (calculado uma vez ou lido do disco), com tabela hash
+        if column not in self._indexes:
+            if self.index_store is not None:
+                index = self.index_store.get(column, self.df)
+            else:
+                index = ColumnIndex.build(self.df[column])
+            self._indexes[column] = index.build_hash()
+        return self._indexes[column]
+
+    def customer_profiles(self):
+        # Perfis alinhados aos códigos de customer_id (linha i = cliente de código i)
+        if self._customer_profiles is None:
+            self._customer_profiles = self.customers.reindex(self.codes('customer_id')[1])
+        return self._customer_profiles
+
+    def mask(self, rows=None, **filters):
+        """Máscara booleana dos filtros, avaliada apenas nas linhas `rows` (None = todas)"""
+        mask = None
+        for column, selected in filters.items():
+            codes, uniques = self.codes(column)
+            if rows is not None:
+                codes = codes[rows]
+            allowed = np.zeros(len(uniques) + 1, dtype=bool)
+            allowed[uniques.get_indexer(list(selected))] = True
+            allowed[-1] = False  # valores não encontrados e NaN (código -1)
+            column_mask = allowed[codes]
+            mask = column_mask if mask is None else mask & column_mask
+        return mask
+
+    def select(self, **filters):
+        """Retorna uma DatasetView com as linhas cujos valores estão nas listas de filtros"""
+        mask = self.mask(**filters)
+        if mask is None or mask.all():
+            return DatasetView(self)
+        return DatasetView(self, np.flatnonzero(mask))
+
+
+class DatasetView:
+    """Visão leve sobre o SharedDataset: guarda apenas os índices das linhas filtradas.
+
+    As colunas só são copiadas quando um gráfico pede por elas (projeção de colunas).
+    Em uma amostra (sampling.py), `weights` guarda o peso de cada linha e as agregações
+    abaixo passam a estimar os valores da população; `sample_mask` marca quais linhas da
+    amostra estão na visão (usado nos intervalos de confiança).
+    """
+
+    def __init__(self, dataset, rows=None, weights=None, sample_mask=None):
+        self.dataset = dataset
+        self.rows = rows  # None = todas as linhas do dataset base
+        self.weights = weights  # None = dados exatos (peso 1)
+        self.sample_mask = sample_mask  # None = a visão não vem de uma amostra
+
+    def __len__(self):
+        return len(self.dataset) if self.rows is None else len(self.rows)
+
+    @property
+    def total_rows(self):
+        """Número de linhas representadas pela visão (estimado em uma amostra)"""
+        return len(self) if self.weights is None else self.weights.sum()
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def row_mask(self):
+        """Máscara booleana (tamanho do dataset base) das linhas da visão"""
+        if self.rows is None:
+            return np.ones(len(self.dataset), dtype=bool)
+        mask = np.zeros(len(self.dataset), dtype=bool)
+        mask[self.rows] = True
+        return mask
+
+    def column(self, name):
+        series = self.dataset.df[name]
+        return series if self.rows is None else series.take(self.rows)
+
+    def frame(self, columns=None):
+        df = self.dataset.df if columns is None else self.dataset.df[list(columns)]
+        if self.rows is None:
+            # Cópia rasa: protege o DataFrame compartilhado sem copiar os dados
+            return df.copy(deep=False) if columns is None else df
+        return df.take(self.rows)
+
+    def customers(self):
+        """Perfis dos clientes com ao menos um pedido na visão (granularidade de cliente)"""
+        codes, uniques = self.dataset.codes('customer_id')
+        if self.rows is not None:
+            codes = codes[self.rows]
+        present = np.bincount(codes[codes >= 0], minlength=len(uniques)) > 0
+        return self.dataset.customer_profiles()[present]
+
+    # Agregações que respeitam os pesos da amostra
+    def total(self, value):
+        values = self.column(value).to_numpy()
+        return values.sum() if self.weights is None else np.dot(values, self.weights)
+
+    def mean(self, value):
+        return self.total(value) / self.total_rows
+
+    def count_by(self, key):
+        if self.weights is None:
+            return self.column(key).value_counts()
+        keys = self.column(key).to_numpy()
+        return pd.Series(self.weights).groupby(keys).sum().rename_axis(key).sort_values(ascending=False)
+
+    def sum_by(self, key, value):
+        frame = self.frame([key, value])
+        if self.weights is not None:
+            frame = frame.assign(**{value: frame[value].to_numpy() * self.weights})
+        return frame.groupby(key)[value].sum()
+
+    def mean_by(self, key, value):
+        if self.weights is None:
+            return self.frame([key, value]).groupby(key)[value].mean()
+        return self.sum_by(key, value) / self.count_by(key)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Particiona o CSV do Foodpanda por ano/mês do pedido')
+    parser.add_argument('source', help='CSV de origem')
+    parser.add_argument('root', help='Diretório de destino')
+    parser.add_argument('--by-city', action='store_true', help='Também particiona por cidade')
+    args = parser.parse_args()
+    columns = ('order_year', 'order_month', 'city') if args.by_city else ('order_year', 'order_month')
+    write_partitions(load_dataset(args.source), args.root, columns)
+    print(f"{len(list_partitions(args.root))} partições gravadas em {args.root}")
@@ -0,0 +1,40 @@
+import math
+
+import numpy as np
+
+# Colunas exibidas na tabela de pedidos detalhados
+DETAIL_COLUMNS = [
+    'order_id', 'order_date', 'customer_id', 'city', 'restaurant_name', 'dish_name',
+    'category', 'quantity', 'price', 'payment_method', 'delivery_status', 'rating'
+]
+PAGE_SIZE = 50
+
+
+# Linhas da visão em ordem, opcionalmente restritas ao resultado de uma busca no índice
+def ordered_rows(view, sort_by, ascending=True, search_column=None, search_text=''):
+    """Posições das linhas da visão na ordem pedida.
+
+    Usa a ordem pré-calculada da coluna (SharedDataset.sort_order) e apenas descarta as
+    linhas fora do filtro, então o custo é linear e não há um novo sort a cada página.
+    """
+    dataset = view.dataset
+    mask = view.row_mask()
+    if search_column and search_text:
+        matches = dataset.index(search_column).prefix(search_text)
+        search_mask = np.zeros(len(dataset), dtype=bool)
+        search_mask[matches] = True
+        mask &= search_mask
+
+    order = dataset.sort_order(sort_by)
+    rows = order[mask[order]]
+    return rows if ascending else rows[::-1]
+
+
+def page_count(rows, page_size=PAGE_SIZE):
+    return max(1, math.ceil(len(rows) / page_size))
+
+
+# Busca apenas as linhas e colunas de uma página
+def fetch_page(dataset, rows, page, page_size=PAGE_SIZE, columns=DETAIL_COLUMNS):
+    start = (page - 1) * page_size
+    return dataset.df[columns].take(rows[start:start + page_size])
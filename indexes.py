@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Colunas com índice de busca
+INDEXED_COLUMNS = ('customer_id', 'order_id', 'restaurant_name')
+
+
+class ColumnIndex:
+    """Índice de uma coluna: valores únicos ordenados e as posições das linhas de cada valor.
+
+    Buscas exatas usam uma tabela hash (O(1)) depois de `build_hash()`, ou busca binária
+    (O(log n)) nos valores ordenados; buscas por prefixo usam sempre a busca binária.
+    Os três arrays podem ser gravados em disco e abertos com memory-map (`save`/`load`).
+    """
+
+    def __init__(self, keys, offsets, positions):
+        self.keys = keys            # valores únicos, ordenados
+        self.offsets = offsets      # linhas do valor i: positions[offsets[i]:offsets[i + 1]]
+        self.positions = positions  # posições das linhas agrupadas por valor (crescentes em cada grupo)
+        self._hash = None
+
+    @classmethod
+    def build(cls, values):
+        codes, uniques = pd.factorize(values, sort=True)
+        present = np.flatnonzero(codes >= 0)  # linhas sem valor (NaN) ficam fora do índice
+        positions = present[np.argsort(codes[present], kind='stable')]
+        counts = np.bincount(codes[present], minlength=len(uniques))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        return cls(np.asarray(uniques).astype(str), offsets, positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def build_hash(self):
+        if self._hash is None:
+            self._hash = pd.Index(self.keys)
+        return self
+
+    def _slot(self, value):
+        if self._hash is not None:
+            return self._hash.get_indexer([value])[0]
+        slot = np.searchsorted(self.keys, value)
+        return slot if slot < len(self.keys) and self.keys[slot] == value else -1
+
+    def lookup(self, value):
+        """Posições (ordenadas) das linhas com valor igual a `value`"""
+        slot = self._slot(str(value))
+        if slot < 0:
+            return self.positions[:0]
+        return np.asarray(self.positions[self.offsets[slot]:self.offsets[slot + 1]])
+
+    def prefix(self, text):
+        """Posições (ordenadas) das linhas cujo valor começa com `text`"""
+        lo = np.searchsorted(self.keys, text, side='left')
+        hi = np.searchsorted(self.keys, text + chr(0x10FFFF), side='left')
+        return np.sort(self.positions[self.offsets[lo]:self.offsets[hi]])
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ('keys', 'offsets', 'positions'):
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory):
+        arrays = [np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+                  for name in ('keys', 'offsets', 'positions')]
+        return cls(*arrays)
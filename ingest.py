@@ -0,0 +1,207 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow é opcional: sem ele, a leitura usa o parser do pandas
+    pa = None
+
+# Esquema conhecido do dataset, na ordem das colunas do CSV.
+# As datas continuam como texto porque é assim que as análises as utilizam.
+STRING, INT, FLOAT = 'str', 'int64', 'float64'
+SCHEMA = {
+    'customer_id': STRING, 'gender': STRING, 'age': STRING, 'city': STRING,
+    'signup_date': STRING, 'order_id': STRING, 'order_date': STRING,
+    'restaurant_name': STRING, 'dish_name': STRING, 'category': STRING,
+    'quantity': INT, 'price': FLOAT, 'payment_method': STRING, 'order_frequency': INT,
+    'last_order_date': STRING, 'loyalty_points': INT, 'churned': STRING, 'rating': INT,
+    'rating_date': STRING, 'delivery_status': STRING, 'city_cod': INT, 'dish_name_cod': INT,
+    'category_cod': INT, 'gender_cod': INT, 'last_order_date_cod': INT, 'churned_cod': INT,
+    'delivery_status_cod': INT, 'payment_method_cod': INT, 'signup_year': INT,
+    'signup_month': STRING, 'order_year': INT, 'order_month': STRING, 'order_day_of_week': STRING
+}
+# Valores lidos como ausentes pelos dois leitores (a lista padrão do pd.read_csv, incluindo o campo vazio)
+NULL_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+               '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+ENGINES = ('auto', 'pyarrow', 'pandas')
+# Bloco lido por thread no parser do pyarrow
+BLOCK_SIZE = 16 << 20
+# Linhas por bloco na leitura em streaming com o pandas (o pyarrow usa blocos de BLOCK_SIZE bytes)
+CHUNK_ROWS = 500_000
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+# Tipos do esquema no pyarrow
+def _arrow_types():
+    arrow_types = {STRING: pa.string(), INT: pa.int64(), FLOAT: pa.float64()}
+    return {column: arrow_types[dtype] for column, dtype in SCHEMA.items()}
+
+
+# Conversão do pyarrow: campos vazios (e os demais NULL_VALUES) viram nulos também nas colunas de texto
+def _convert_options():
+    return pa_csv.ConvertOptions(column_types=_arrow_types(), null_values=NULL_VALUES, strings_can_be_null=True)
+
+
+# Leitura com o parser multi-thread do pyarrow (descompacta .gz/.bz2/.zst/.lz4 pela extensão)
+def _read_pyarrow(path):
+    read_options = pa_csv.ReadOptions(use_threads=True, block_size=BLOCK_SIZE)
+    with pa.input_stream(path, compression='detect') as stream:
+        table = pa_csv.read_csv(stream, read_options=read_options, convert_options=_convert_options())
+    return table.to_pandas()
+
+
+# Tipos do esquema no pandas: inteiros lidos como Int64 (aceitam campos vazios)
+def _pandas_types():
+    return {column: 'Int64' if dtype == INT else dtype for column, dtype in SCHEMA.items()}
+
+
+# Argumentos do pd.read_csv com os tipos do esquema (sem inferência) e os mesmos nulos do pyarrow
+def _pandas_options():
+    return {'dtype': _pandas_types(), 'na_values': NULL_VALUES, 'keep_default_na': False, 'compression': 'infer'}
+
+
+# Inteiros como no to_pandas do pyarrow: int64 sem valores ausentes, float64 (NaN) com ausentes
+def _finish_pandas(df):
+    for column, dtype in SCHEMA.items():
+        if dtype == INT and column in df.columns:
+            df[column] = df[column].astype(FLOAT if df[column].hasnans else INT)
+    return df
+
+
+# Leitura com o parser do pandas
+def _read_pandas(path):
+    return _finish_pandas(pd.read_csv(path, **_pandas_options()))
+
+
+# Escolha do leitor: engine='auto' usa o pyarrow quando ele está instalado
+def _use_pyarrow(engine):
+    if engine not in ENGINES:
+        raise ValueError(f"Engine desconhecida: {engine}. Use uma de {ENGINES}")
+    if engine == 'pyarrow' and pa is None:
+        raise ImportError("A engine 'pyarrow' precisa do pacote pyarrow (pip install pyarrow)")
+    return engine == 'pyarrow' or (engine == 'auto' and pa is not None)
+
+
+def read_csv(path, engine='auto'):
+    """Lê um CSV do Foodpanda (compactado ou não) com os tipos do esquema.
+
+    engine='auto' usa o pyarrow quando ele está instalado e o pandas caso contrário.
+    """
+    if _use_pyarrow(engine):
+        return _read_pyarrow(path)
+    return _read_pandas(path)
+
+
+def read_csv_chunks(path, engine='auto', chunk_rows=CHUNK_ROWS):
+    """Lê o CSV em blocos (DataFrames), para agregações em streaming sem carregar o arquivo inteiro"""
+    if _use_pyarrow(engine):
+        read_options = pa_csv.ReadOptions(use_threads=True, block_size=BLOCK_SIZE)
+        with pa.input_stream(path, compression='detect') as stream:
+            for batch in pa_csv.open_csv(stream, read_options=read_options, convert_options=_convert_options()):
+                yield batch.to_pandas()
+    else:
+        with pd.read_csv(path, chunksize=chunk_rows, **_pandas_options()) as reader:
+            for chunk in reader:
+                yield _finish_pandas(chunk)
+
+
+# Gera uma cópia do dataset aumentada `scale` vezes (opcionalmente compactada)
+def _scaled_copy(source, directory, scale, compression=None):
+    target = os.path.join(directory, f'scaled_x{scale}.csv')
+    with open(source, 'rb') as f:
+        header = f.readline()
+        body = f.read()
+    if not body.endswith(b'\n'):
+        body += b'\n'
+    with open(target, 'wb') as f:
+        f.write(header)
+        for _ in range(scale):
+            f.write(body)
+    if compression is None:
+        return target
+    compressed = target + COMPRESSION_SUFFIXES[compression]
+    with open(target, 'rb') as raw, pa.output_stream(compressed, compression=compression) as out:
+        shutil.copyfileobj(raw, out, length=BLOCK_SIZE)
+    return compressed
+
+
+# Cópia do dataset com campos vazios em colunas de texto (obrigatórias e opcionais) e numéricas
+BLANK_FIELDS = {'customer_id': 0, 'gender': 1, 'rating': 2, 'quantity': 3, 'price': 4, 'city': 5, 'category': 6}
+
+
+def blank_field_copy(source, target, fields=BLANK_FIELDS):
+    """Grava em `target` uma cópia de `source` com o campo vazio em cada {coluna: linha} de `fields`"""
+    raw = pd.read_csv(source, dtype=str, keep_default_na=False)
+    for column, row in fields.items():
+        raw.loc[row, column] = ''
+    raw.to_csv(target, index=False)
+    return target
+
+
+def check_engines(source):
+    """Confere que os dois leitores (inteiro e em blocos) devolvem DataFrames idênticos para uma
+    cópia de `source` com campos vazios; levanta AssertionError na primeira diferença"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = blank_field_copy(source, os.path.join(directory, 'blank_fields.csv'))
+        expected = _read_pandas(path)
+        pd.testing.assert_frame_equal(_read_pyarrow(path), expected)
+        for engine in ('pyarrow', 'pandas'):
+            chunks = pd.concat(read_csv_chunks(path, engine, chunk_rows=len(expected)), ignore_index=True)
+            pd.testing.assert_frame_equal(chunks, expected)
+        return expected
+
+
+# Relatório de vazão (MB/s e linhas/s) das formas de leitura
+def benchmark(source, scale=20, compressions=(None,), repeat=3):
+    readers = {'pd.read_csv (atual)': lambda path: pd.read_csv(path)}
+    readers['pandas + esquema'] = _read_pandas
+    if pa is not None:
+        readers['pyarrow + esquema'] = _read_pyarrow
+
+    with tempfile.TemporaryDirectory() as directory:
+        uncompressed = _scaled_copy(source, directory, scale)
+        raw_mb = os.path.getsize(uncompressed) / 1e6
+        print(f"Dataset: {source} x{scale} ({raw_mb:,.1f} MB sem compressão)")
+        print(f"{'Arquivo':<12} {'Leitor':<22} {'Tempo (s)':>10} {'MB/s':>10} {'Linhas/s':>14}")
+        for compression in compressions:
+            if compression is not None and pa is None:
+                print(f"{compression}: requer pyarrow para gerar o arquivo compactado")
+                continue
+            path = uncompressed if compression is None else _scaled_copy(source, directory, scale, compression)
+            for name, reader in readers.items():
+                try:
+                    best, rows = float('inf'), 0
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        rows = len(reader(path))
+                        best = min(best, time.perf_counter() - start)
+                except ImportError as error:
+                    print(f"{compression or 'csv':<12} {name:<22} indisponível ({error})")
+                    continue
+                # MB/s medido sobre o tamanho sem compressão, para comparar as variantes
+                print(f"{compression or 'csv':<12} {name:<22} {best:>10.3f} {raw_mb / best:>10.1f} {rows / best:>14,.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Relatório de vazão da leitura do dataset')
+    parser.add_argument('--dataset', default='manipulated_foodpanda_analysis_dataset.csv')
+    parser.add_argument('--scale', type=int, default=20, help='Quantas vezes replicar o dataset')
+    parser.add_argument('--compression', nargs='*', default=[], choices=['gzip', 'zstd'],
+                        help='Também mede arquivos compactados')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--check', action='store_true',
+                        help='Só confere se pyarrow e pandas leem igual um CSV com campos vazios')
+    args = parser.parse_args()
+    if args.check:
+        if pa is None:
+            raise SystemExit("A conferência precisa do pyarrow (pip install pyarrow)")
+        df = check_engines(args.dataset)
+        print(f"pyarrow e pandas idênticos: {len(df):,} linhas, {int(df.isna().sum().sum())} campos ausentes")
+    else:
+        benchmark(args.dataset, args.scale, [None] + args.compression, args.repeat)
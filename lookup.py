@@ -0,0 +1,159 @@
+import argparse
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from data_store import DATASET_PATH, add_dataset_arguments, dataset_filters, load_dataset
+from indexes import INDEXED_COLUMNS, ColumnIndex
+from report_cache import dataset_fingerprint, dataset_key
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # sem pyarrow, a busca pela linha de comando relê o dataset
+    pa = None
+
+INDEX_DIR = '.indexes'
+
+
+class IndexStore:
+    """Índices de busca persistidos em disco, um diretório por versão do dataset.
+
+    O diretório é identificado pela origem (caminho e filtros, report_cache.dataset_key) e pela
+    impressão digital do dataset (a mesma do cache de relatórios), então índices de outra
+    versão dos dados nunca são reutilizados; ao criar o diretório de uma nova versão, só os das
+    versões anteriores da mesma origem são removidos.
+    """
+
+    def __init__(self, path=DATASET_PATH, filters=None, root=INDEX_DIR):
+        self.path = path
+        self.filters = filters
+        self.root = root
+        self.key = dataset_key(path, filters)
+        self.directory = os.path.join(root, f'{self.key}-{dataset_fingerprint(path, filters)}')
+
+    def exists(self, column):
+        return os.path.exists(os.path.join(self.directory, column, 'positions.npy'))
+
+    def get(self, column, df=None):
+        """Abre o índice da coluna (memory-map) ou o constrói a partir de `df` e grava"""
+        if not self.exists(column):
+            if df is None:
+                df = load_dataset(self.path, self.filters)
+            if not os.path.isdir(self.directory):
+                self._evict()
+            ColumnIndex.build(df[column]).save(os.path.join(self.directory, column))
+        try:
+            return ColumnIndex.load(os.path.join(self.directory, column))
+        except FileNotFoundError:  # removido por outro processo: monta o índice em memória
+            return ColumnIndex.build(load_dataset(self.path, self.filters)[column] if df is None else df[column])
+
+    # Remove os diretórios de versões anteriores da mesma origem (cada um tem uma cópia completa
+    # em rows.arrow); os de outros filtros continuam em uso
+    def _evict(self):
+        if not os.path.isdir(self.root):
+            return
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(f'{self.key}-') and path != self.directory:
+                shutil.rmtree(path, ignore_errors=True)
+
+    # Cópia colunar do dataset (Arrow/Feather) para ler só as linhas encontradas
+    def snapshot_path(self):
+        return os.path.join(self.directory, 'rows.arrow')
+
+    def build(self, df=None, columns=INDEXED_COLUMNS):
+        if df is None:
+            df = load_dataset(self.path, self.filters)
+        for column in columns:
+            self.get(column, df)
+        if pa is not None and not os.path.exists(self.snapshot_path()):
+            feather.write_feather(df, self.snapshot_path(), compression='uncompressed')
+        return df
+
+    def read_rows(self, positions):
+        """Linhas nas posições pedidas, sem carregar o dataset inteiro quando há snapshot"""
+        if pa is not None and os.path.exists(self.snapshot_path()):
+            try:
+                with pa.memory_map(self.snapshot_path()) as source:
+                    table = pa.ipc.open_file(source).read_all()
+                    return table.take(pa.array(positions, type=pa.int64())).to_pandas()
+            except FileNotFoundError:  # removido por outro processo: relê o dataset
+                pass
+        return load_dataset(self.path, self.filters).take(positions).reset_index(drop=True)
+
+
+# Resumo de um cliente: histórico de pedidos, gasto, avaliações e status de churn
+def customer_drilldown(orders):
+    orders = orders.sort_values('order_date')
+    return {
+        'summary': {
+            'Pedidos': len(orders),
+            'Gasto Total': orders['price'].sum(),
+            'Ticket Médio': orders['price'].mean(),
+            'Avaliação Média': orders['rating'].mean(),
+            'Cancelamentos': int((orders['delivery_status'] == 'Cancelled').sum()),
+            'Status': orders['churned'].iloc[-1],
+            'Cidade': orders['city'].iloc[-1],
+            'Cadastro': orders['signup_date'].iloc[-1],
+            'Último Pedido': orders['last_order_date'].iloc[-1],
+            'Pontos de Fidelidade': orders['loyalty_points'].iloc[-1]
+        },
+        'orders': orders
+    }
+
+
+# Resumo de um restaurante: receita, avaliações, pratos e cidades
+def restaurant_drilldown(orders):
+    return {
+        'summary': {
+            'Pedidos': len(orders),
+            'Receita Total': orders['price'].sum(),
+            'Ticket Médio': orders['price'].mean(),
+            'Avaliação Média': orders['rating'].mean(),
+            'Taxa de Cancelamento (%)': (orders['delivery_status'] == 'Cancelled').mean() * 100,
+            'Clientes Inativos (%)': (orders['churned'] == 'Inactive').mean() * 100
+        },
+        'dishes': orders.groupby('dish_name').agg(
+            pedidos=('order_id', 'size'), receita=('price', 'sum'), avaliacao=('rating', 'mean')
+        ).sort_values('pedidos', ascending=False),
+        'cities': orders.groupby('city').agg(
+            pedidos=('order_id', 'size'), receita=('price', 'sum'), avaliacao=('rating', 'mean')
+        ).sort_values('pedidos', ascending=False),
+        'orders': orders.sort_values('order_date')
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Busca pedidos por customer_id, order_id ou restaurant_name')
+    parser.add_argument('column', choices=INDEXED_COLUMNS)
+    parser.add_argument('value')
+    parser.add_argument('--prefix', action='store_true', help='Busca valores que começam com VALUE')
+    args = add_dataset_arguments(parser).parse_args()
+
+    start = time.perf_counter()
+    store = IndexStore(args.dataset, dataset_filters(args))
+    if not store.exists(args.column):
+        print("Construindo os índices (apenas na primeira busca para esta versão do dataset)...")
+        store.build()
+    index = store.get(args.column)
+    positions = index.prefix(args.value) if args.prefix else index.lookup(args.value)
+    rows = store.read_rows(positions)
+    elapsed = time.perf_counter() - start
+
+    pd.set_option('display.max_columns', None)
+    pd.set_option('display.width', None)
+    print(f"{len(rows):,} pedido(s) encontrados em {elapsed * 1000:.1f} ms")
+    if len(rows) == 0:
+        raise SystemExit(1)
+    if args.column == 'customer_id' and not args.prefix:
+        summary = customer_drilldown(rows)['summary']
+    elif args.column == 'restaurant_name' and not args.prefix:
+        summary = restaurant_drilldown(rows)['summary']
+    else:
+        summary = {}
+    for name, value in summary.items():
+        print(f"{name}: {value:,.2f}" if isinstance(value, float) else f"{name}: {value}")
+    print(rows.to_string(index=False))
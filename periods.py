@@ -0,0 +1,128 @@
+import argparse
+import calendar
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from data_store import add_dataset_arguments, dataset_filters, load_dataset
+
+# Dimensões e métricas da comparação entre períodos
+DIMENSIONS = ('city', 'payment_method', 'age', 'category')
+METRICS = ('orders', 'revenue', 'avg_price', 'avg_rating', 'cancellation_rate')
+# Colunas lidas pela comparação
+PERIOD_COLUMNS = ['order_date', 'price', 'rating', 'delivery_status'] + list(DIMENSIONS)
+
+# Período com datas inclusivas no formato do dataset (AAAA-MM-DD)
+Period = namedtuple('Period', ['label', 'start', 'end'])
+
+
+def parse_period(text):
+    """Período a partir de '2024' (ano), '2024-08' (mês) ou '2024-01-01:2024-06-30' (intervalo)"""
+    text = str(text).strip()
+    if re.fullmatch(r'\d{4}', text):
+        return Period(text, f'{text}-01-01', f'{text}-12-31')
+    if re.fullmatch(r'\d{4}-\d{2}', text):
+        year, month = map(int, text.split('-'))
+        return Period(text, f'{text}-01', f'{text}-{calendar.monthrange(year, month)[1]:02d}')
+    match = re.fullmatch(r'(\d{4}-\d{2}-\d{2})\s*:\s*(\d{4}-\d{2}-\d{2})', text)
+    if match:
+        return Period(text, match.group(1), match.group(2))
+    raise ValueError(f"Período inválido: '{text}'. Use AAAA, AAAA-MM ou AAAA-MM-DD:AAAA-MM-DD")
+
+
+def period_aggregates(df, periods, dimensions=DIMENSIONS):
+    """Totais por (período, grupo) de cada dimensão, com todos os períodos em uma passada.
+
+    As linhas de cada período são empilhadas com o código do período (períodos podem se
+    sobrepor) e cada dimensão é agregada uma única vez por bincount da chave
+    período x grupo, então mais períodos quase não custam nada a mais.
+    """
+    periods = [parse_period(period) for period in periods]
+    labels = [period.label for period in periods]
+    if len(set(labels)) != len(labels):
+        raise ValueError("Os períodos comparados devem ser diferentes")
+
+    dates = df['order_date']
+    selections = [np.flatnonzero(((dates >= period.start) & (dates <= period.end)).to_numpy())
+                  for period in periods]
+    rows = np.concatenate(selections)
+    period_codes = np.repeat(np.arange(len(periods)), [len(selected) for selected in selections])
+    price = df['price'].to_numpy(dtype=float)[rows]
+    rating = df['rating'].to_numpy(dtype=float)[rows]
+    # Avaliação média só sobre os pedidos avaliados
+    rated = ~np.isnan(rating)
+    rating = np.where(rated, rating, 0)
+    cancelled = (df['delivery_status'].to_numpy()[rows] == 'Cancelled').astype(float)
+
+    aggregates = {}
+    for dimension in ('total',) + tuple(dimensions):
+        if dimension == 'total':
+            codes, groups = np.zeros(len(rows), dtype=np.int64), pd.Index(['Total'])
+        else:
+            codes, groups = pd.factorize(df[dimension].to_numpy()[rows], sort=True)
+        # Pedidos sem valor na dimensão (código -1) ficam fora dos grupos (continuam no total)
+        present = codes >= 0
+        key = (period_codes * len(groups) + codes)[present]
+        size = len(periods) * len(groups)
+        orders = np.bincount(key, minlength=size)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            aggregates[dimension] = pd.DataFrame({
+                'orders': orders,
+                'revenue': np.bincount(key, weights=price[present], minlength=size),
+                'avg_price': np.bincount(key, weights=price[present], minlength=size) / orders,
+                'avg_rating': (np.bincount(key, weights=rating[present], minlength=size)
+                               / np.bincount(key, weights=rated[present], minlength=size)),
+                'cancellation_rate': np.bincount(key, weights=cancelled[present], minlength=size) / orders * 100
+            }, index=pd.MultiIndex.from_product([labels, groups], names=['period', dimension]))
+    return aggregates
+
+
+def compare(aggregates, base, other):
+    """Métricas lado a lado de dois períodos com a variação (% ou pontos percentuais na taxa)"""
+    comparison = {}
+    for dimension, frame in aggregates.items():
+        first = frame.xs(base, level='period')
+        second = frame.xs(other, level='period')
+        delta = (second - first) / first.abs() * 100
+        delta['cancellation_rate'] = second['cancellation_rate'] - first['cancellation_rate']
+        comparison[dimension] = pd.concat(
+            {metric: pd.DataFrame({base: first[metric], other: second[metric], 'Δ': delta[metric]})
+             for metric in METRICS},
+            axis=1
+        )
+    return comparison
+
+
+# Tipo argparse: valida o período e devolve o seu rótulo
+def period_argument(text):
+    try:
+        return parse_period(text).label
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+# Opção --compare BASE OTHER dos scripts de relatório (None quando não informada)
+def parse_compare_args(argv=None):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'OTHER'), type=period_argument)
+    args, _ = parser.parse_known_args(argv)
+    if args.compare and args.compare[0] == args.compare[1]:
+        parser.error("os períodos comparados devem ser diferentes")
+    return args.compare
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Comparação entre dois períodos (ano, mês ou intervalo de datas)')
+    parser.add_argument('base', type=period_argument, help='Período de referência: AAAA, AAAA-MM ou AAAA-MM-DD:AAAA-MM-DD')
+    parser.add_argument('other', type=period_argument, help='Período comparado')
+    args = add_dataset_arguments(parser).parse_args()
+
+    df = load_dataset(args.dataset, dataset_filters(args))
+    base, other = args.base, args.other
+    pd.set_option('display.width', None)
+    pd.set_option('display.max_columns', None)
+    for dimension, table in compare(period_aggregates(df, [base, other]), base, other).items():
+        print(f"\n{dimension.upper()}: {base} vs {other} (Δ em %, taxa de cancelamento em pontos percentuais)")
+        print(table.to_string(float_format="%.2f"))
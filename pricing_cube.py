@@ -0,0 +1,156 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from data_store import SharedDataset, add_dataset_arguments, dataset_filters, load_dataset
+
+# Eixos do cubo e medidas guardadas em cada célula
+DIMENSIONS = ('restaurant_name', 'dish_name', 'city')
+MEASURES = ('count', 'price_sum', 'quantity_sum', 'rating_sum')
+
+
+class PricingCube:
+    """Cubo esparso restaurante x prato x cidade (formato de coordenadas, COO).
+
+    Só as combinações com pedidos são guardadas: `coords` tem uma linha por célula não
+    vazia (códigos dos três eixos, em ordem lexicográfica) e cada medida é um vetor
+    alinhado a ela, então a memória cresce com o número de células, não com o produto
+    dos eixos. Fatias filtram as células; marginais somam as medidas sobre os eixos omitidos.
+    """
+
+    def __init__(self, labels, coords, measures):
+        self.labels = dict(zip(DIMENSIONS, labels))  # rótulos de cada eixo (pd.Index)
+        self.coords = coords
+        self.measures = measures
+
+    @classmethod
+    def from_codes(cls, codes, labels, price, quantity, rating, weights=None):
+        """Cubo a partir dos códigos inteiros dos três eixos (um vetor por eixo, -1 = ausente)"""
+        codes = [np.asarray(axis_codes) for axis_codes in codes]
+        present = np.logical_and.reduce([axis_codes >= 0 for axis_codes in codes])
+        shape = tuple(len(axis_labels) for axis_labels in labels)
+        flat = np.ravel_multi_index([axis_codes[present] for axis_codes in codes], shape)
+        # Uma célula por combinação presente: np.unique ordena e numera as células não vazias
+        cells, cell_of_row = np.unique(flat, return_inverse=True)
+        weights = np.ones(len(flat)) if weights is None else np.asarray(weights, dtype=float)[present]
+        values = {
+            'count': weights,
+            'price_sum': np.asarray(price, dtype=float)[present] * weights,
+            'quantity_sum': np.asarray(quantity, dtype=float)[present] * weights,
+            'rating_sum': np.asarray(rating, dtype=float)[present] * weights
+        }
+        measures = {name: np.bincount(cell_of_row, weights=value, minlength=len(cells))
+                    for name, value in values.items()}
+        coords = np.column_stack(np.unravel_index(cells, shape)).astype(np.int32)
+        return cls(labels, coords, measures)
+
+    @classmethod
+    def from_view(cls, view):
+        """Cubo das linhas de uma DatasetView (pesos da amostra no modo prévia)"""
+        columns = [view.dataset.codes(dimension) for dimension in DIMENSIONS]
+        codes = [axis_codes for axis_codes, _ in columns]
+        price, quantity, rating = (view.dataset.df[name].to_numpy() for name in ('price', 'quantity', 'rating'))
+        if view.rows is not None:
+            codes = [axis_codes[view.rows] for axis_codes in codes]
+            price, quantity, rating = price[view.rows], quantity[view.rows], rating[view.rows]
+        return cls.from_codes(codes, [uniques for _, uniques in columns], price, quantity, rating, view.weights)
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls.from_view(SharedDataset(df).select())
+
+    def __len__(self):
+        return len(self.coords)
+
+    @property
+    def shape(self):
+        return tuple(len(self.labels[dimension]) for dimension in DIMENSIONS)
+
+    @property
+    def nbytes(self):
+        return self.coords.nbytes + sum(values.nbytes for values in self.measures.values())
+
+    def slice(self, **selection):
+        """Subcubo com as células cujos rótulos estão na seleção (ex.: dish_name='Pizza')"""
+        keep = np.ones(len(self), dtype=bool)
+        for dimension, values in selection.items():
+            axis = DIMENSIONS.index(dimension)
+            values = [values] if isinstance(values, str) or not np.iterable(values) else list(values)
+            allowed = np.zeros(len(self.labels[dimension]), dtype=bool)
+            positions = self.labels[dimension].get_indexer(values)
+            allowed[positions[positions >= 0]] = True
+            keep &= allowed[self.coords[:, axis]]
+        return PricingCube(list(self.labels.values()), self.coords[keep],
+                           {name: values[keep] for name, values in self.measures.items()})
+
+    def marginal(self, *dimensions):
+        """Medidas somadas sobre os eixos fora de `dimensions`, com as médias derivadas.
+
+        Uma linha por combinação não vazia dos eixos pedidos (sem eixos: o total).
+        """
+        axes = [DIMENSIONS.index(dimension) for dimension in dimensions]
+        if axes:
+            shape = tuple(len(self.labels[dimension]) for dimension in dimensions)
+            flat = np.ravel_multi_index([self.coords[:, axis] for axis in axes], shape)
+            groups, group_of_cell = np.unique(flat, return_inverse=True)
+            group_coords = np.unravel_index(groups, shape)
+            index = pd.MultiIndex.from_arrays(
+                [self.labels[dimension][positions] for dimension, positions in zip(dimensions, group_coords)],
+                names=list(dimensions)
+            )
+            if len(dimensions) == 1:
+                index = index.get_level_values(0)
+        else:
+            groups, group_of_cell = np.zeros(1), np.zeros(len(self), dtype=np.int64)
+            index = pd.Index(['Total'])
+        totals = pd.DataFrame({name: np.bincount(group_of_cell, weights=values, minlength=len(groups))
+                               for name, values in self.measures.items()}, index=index)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            totals['revenue'] = totals['price_sum']
+            totals['avg_price'] = totals['price_sum'] / totals['count']
+            totals['avg_quantity'] = totals['quantity_sum'] / totals['count']
+            totals['avg_rating'] = totals['rating_sum'] / totals['count']
+        return totals
+
+
+# Preço médio do prato em cada restaurante (linhas) e cidade (colunas), com a média geral
+def dish_price_comparison(cube, dish):
+    dish_cube = cube.slice(dish_name=dish)
+    prices = dish_cube.marginal('restaurant_name', 'city')['avg_price'].unstack('city')
+    prices['Todas'] = dish_cube.marginal('restaurant_name')['avg_price']
+    return prices.sort_values('Todas')
+
+
+# Participação (%) de cada prato nos pedidos de cada cidade
+def menu_mix(cube):
+    counts = cube.marginal('city', 'dish_name')['count'].unstack('dish_name', fill_value=0)
+    return counts.div(counts.sum(axis=1), axis=0) * 100
+
+
+# Receita de cada restaurante, no total e por cidade
+def restaurant_revenue(cube):
+    revenue = cube.marginal('restaurant_name', 'city')['revenue'].unstack('city', fill_value=0)
+    revenue.insert(0, 'Total', cube.marginal('restaurant_name')['revenue'])
+    return revenue.sort_values('Total', ascending=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cubo esparso restaurante x prato x cidade')
+    parser.add_argument('--dish', nargs='+', help='Pratos para comparar o preço entre restaurantes')
+    args = add_dataset_arguments(parser).parse_args()
+
+    cube = PricingCube.from_frame(load_dataset(args.dataset, dataset_filters(args)))
+    pd.set_option('display.width', None)
+    pd.set_option('display.max_columns', None)
+    cells = np.prod(cube.shape)
+    print(f"Cubo {' x '.join(map(str, cube.shape))}: {len(cube):,} de {cells:,} células não vazias "
+          f"({cube.nbytes / 1024:,.1f} KiB)")
+
+    print("\nReceita por restaurante:")
+    print(restaurant_revenue(cube).to_string(float_format="%.2f"))
+    print("\nMix de pratos por cidade (% dos pedidos):")
+    print(menu_mix(cube).to_string(float_format="%.1f"))
+    for dish in args.dish or list(cube.labels['dish_name']):
+        print(f"\nPreço médio de {dish} por restaurante e cidade:")
+        print(dish_price_comparison(cube, dish).to_string(float_format="%.2f"))
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# Métricas suportadas pelo motor de rankings
+METRICS = ('count', 'revenue', 'mean_rating')
+
+
+# Seleção parcial dos k maiores valores (sem ordenar todos os grupos)
+def top_n(values, labels, k):
+    """Retorna as posições dos k maiores valores, em ordem decrescente.
+
+    Empates são desfeitos pelo rótulo em ordem alfabética, então o resultado é determinístico.
+    Valores NaN são ignorados.
+    """
+    valid = np.flatnonzero(~np.isnan(values))
+    if k <= 0 or len(valid) == 0:
+        return valid[:0]
+    if len(valid) > k:
+        # argpartition: O(n) para achar o k-ésimo maior valor (limiar)
+        threshold = values[valid[np.argpartition(-values[valid], k - 1)[k - 1]]]
+        # Mantém todos os empatados no limiar para desempatar pelo rótulo
+        valid = valid[values[valid] >= threshold]
+    order = np.lexsort((np.asarray(labels[valid]).astype(str), -values[valid]))
+    return valid[order[:k]]
+
+
+class RankingEngine:
+    """Calcula vários rankings top-N sobre uma DatasetView.
+
+    Cada coluna-chave é agregada uma única vez (contagem, receita e soma das avaliações
+    com np.bincount sobre os códigos inteiros da coluna); todos os rankings dessa
+    chave reutilizam a mesma agregação.
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self._aggregates = {}
+
+    def _aggregate(self, key):
+        if key not in self._aggregates:
+            codes, uniques = self.view.dataset.codes(key)
+            price = self.view.dataset.df['price'].to_numpy()
+            rating = self.view.dataset.df['rating'].to_numpy()
+            if self.view.rows is not None:
+                codes = codes[self.view.rows]
+                price = price[self.view.rows]
+                rating = rating[self.view.rows]
+            # Linhas com chave ausente (código -1) ficam fora do ranking
+            present = codes >= 0
+            codes, price, rating = codes[present], price[present], rating[present]
+            # Em uma amostra, cada linha conta com o seu peso
+            weights = np.ones(len(codes)) if self.view.weights is None else self.view.weights[present]
+            size = len(uniques)
+            count = np.bincount(codes, weights=weights, minlength=size)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self._aggregates[key] = {
+                    'labels': np.asarray(uniques, dtype=object),
+                    'uniques': uniques,
+                    'count': np.where(count > 0, count, np.nan),
+                    'revenue': np.where(count > 0, np.bincount(codes, weights=price * weights, minlength=size), np.nan),
+                    'mean_rating': np.bincount(codes, weights=rating * weights, minlength=size) / count
+                }
+        return self._aggregates[key]
+
+    def top(self, key, metric='count', k=5):
+        """Top-k valores de `key` pela métrica, como Series (rótulo -> valor) em ordem decrescente"""
+        if metric not in METRICS:
+            raise ValueError(f"Métrica desconhecida: {metric}. Use uma de {METRICS}")
+        aggregate = self._aggregate(key)
+        values = aggregate[metric]
+        positions = top_n(values, aggregate['labels'], k)
+        result = pd.Series(values[positions], index=aggregate['uniques'][positions], name=metric)
+        result.index.name = key
+        return result.round().astype(int) if metric == 'count' else result
+
+    def compute(self, specs):
+        """Calcula vários rankings de uma vez: specs = {nome: (chave, métrica, k)}"""
+        return {name: self.top(key, metric, k) for name, (key, metric, k) in specs.items()}
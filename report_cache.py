@@ -0,0 +1,227 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+
+from data_store import DATASET_PATH, dataset_files, load_dataset, loader_version
+
+CACHE_DIR = '.report_cache'
+
+
+# Hash do conteúdo de um arquivo, recalculado só quando o tamanho ou a data de modificação mudam
+def _file_digest(path, stamps):
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    if key in stamps and stamps[key]['stamp'] == stamp:
+        return stamps[key]['digest']
+
+    content_hash = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            content_hash.update(block)
+    digest = content_hash.hexdigest()
+    stamps[key] = {'stamp': stamp, 'digest': digest}
+    return digest
+
+
+# Hash do conteúdo de cada arquivo (as marcas de tamanho/data ficam em fingerprints.json)
+def file_digests(paths, cache_dir=CACHE_DIR):
+    stamp_file = os.path.join(cache_dir, 'fingerprints.json')
+    stamps = {}
+    if os.path.exists(stamp_file):
+        with open(stamp_file) as f:
+            stamps = json.load(f)
+    known = json.dumps(stamps, sort_keys=True)
+
+    digests = [_file_digest(path, stamps) for path in paths]
+
+    if json.dumps(stamps, sort_keys=True) != known:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(stamp_file, 'w') as f:
+            json.dump(stamps, f)
+    return digests
+
+
+# Chave da origem dos dados (caminho + filtros de partição), estável entre versões do conteúdo:
+# entradas e diretórios de uma mesma chave com outra impressão digital estão desatualizados
+def dataset_key(path=DATASET_PATH, filters=None):
+    key = json.dumps([os.path.abspath(path),
+                      {column: sorted(map(str, values)) for column, values in (filters or {}).items()}],
+                     sort_keys=True)
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+# Impressão digital do dataset: hash do conteúdo dos arquivos lidos, dos filtros de partição e da
+# versão do carregador (outra leitura ou validação pode mudar as linhas carregadas e as suas posições)
+def dataset_fingerprint(path=DATASET_PATH, filters=None, cache_dir=CACHE_DIR):
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    files = [file_path for file_path, _ in dataset_files(path, filters)]
+    digests = file_digests(files, cache_dir)
+
+    # Novas partições (ou partições alteradas) mudam a impressão digital
+    combined = hashlib.blake2b(loader_version().encode(), digest_size=16)
+    for file_path, digest in zip(files, digests):
+        combined.update(os.path.relpath(file_path, path).encode())
+        combined.update(digest.encode())
+    combined.update(json.dumps({column: sorted(map(str, values)) for column, values in (filters or {}).items()},
+                               sort_keys=True).encode())
+    return combined.hexdigest()
+
+
+# Objeto definido em um arquivo do diretório do projeto (funções, classes e módulos)
+def _in_project(obj, project):
+    try:
+        return os.path.dirname(inspect.getsourcefile(obj)) == project
+    except TypeError:  # objetos embutidos (sem arquivo-fonte)
+        return False
+
+
+# Código-fonte de uma função, classe ou módulo; classes geradas (namedtuple) usam o módulo inteiro
+def _source(obj):
+    try:
+        return inspect.getsource(obj)
+    except OSError:
+        return inspect.getsource(sys.modules[obj.__module__])
+
+
+# Funções de uma classe (métodos, métodos estáticos/de classe e properties)
+def _methods(cls):
+    for value in vars(cls).values():
+        if isinstance(value, (staticmethod, classmethod)):
+            value = value.__func__
+        if isinstance(value, property):
+            yield from (accessor for accessor in (value.fget, value.fset) if accessor is not None)
+        elif inspect.isfunction(value):
+            yield value
+
+
+# Objetos de código de uma função, incluindo os aninhados (compreensões, lambdas, funções internas)
+def _code_objects(code):
+    yield code
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            yield from _code_objects(const)
+
+
+# Representação estável de uma constante de módulo; funções e classes do projeto dentro dela
+# entram em `pending`. None para valores que não são dados simples
+def _constant(value, project, pending):
+    if isinstance(value, (str, bytes, int, float, complex, bool, type(None))):
+        return repr(value)
+    if isinstance(value, (tuple, list)):
+        items = [_constant(item, project, pending) for item in value]
+        return None if None in items else f"{type(value).__name__}[{', '.join(items)}]"
+    if isinstance(value, (set, frozenset)):
+        items = [_constant(item, project, pending) for item in value]
+        return None if None in items else f"set[{', '.join(sorted(items))}]"
+    if isinstance(value, dict):
+        items = [(_constant(key, project, pending), _constant(item, project, pending)) for key, item in value.items()]
+        return None if any(None in pair for pair in items) else f"dict[{', '.join(f'{k}: {v}' for k, v in items)}]"
+    if (inspect.isfunction(value) or inspect.isclass(value)) and _in_project(value, project):
+        pending.append(value)
+        return f'{value.__module__}.{value.__qualname__}'
+    return None
+
+
+# Hash da versão do código de uma seção. Segue, a partir da função, tudo que ela usa no projeto:
+# funções auxiliares (como as de significance.py), inclusive as chamadas dentro de compreensões e
+# lambdas, classes (código-fonte de todos os métodos), módulos do projeto usados como `modulo.nome`
+# (código-fonte inteiro) e as constantes de módulo (CORRELATION_COLUMNS, RANGES, ...)
+def code_version(func):
+    project = os.path.dirname(inspect.getsourcefile(func))
+    digest = hashlib.blake2b(digest_size=16)
+    pending, seen = [func], set()
+    while pending:
+        current = pending.pop()
+        key = (current.__module__, current.__qualname__) if not inspect.ismodule(current) else (current.__name__,)
+        if key in seen:
+            continue
+        seen.add(key)
+        digest.update(_source(current).encode())
+        if inspect.ismodule(current):
+            continue
+
+        functions = list(_methods(current)) if inspect.isclass(current) else [current]
+        if inspect.isclass(current):
+            pending.extend(base for base in current.__bases__ if _in_project(base, project))
+        for function in functions:
+            # Valores padrão dos parâmetros (como columns=CORRELATION_COLUMNS) não aparecem no código
+            defaults = _constant([function.__defaults__, function.__kwdefaults__], project, pending)
+            if defaults is not None:
+                digest.update(f'{function.__qualname__}:{defaults}'.encode())
+            names = {name for code in _code_objects(function.__code__) for name in code.co_names}
+            for name in sorted(names):
+                if name not in function.__globals__:
+                    continue
+                value = function.__globals__[name]
+                if inspect.ismodule(value) or inspect.isfunction(value) or inspect.isclass(value):
+                    if _in_project(value, project):
+                        pending.append(value)
+                    continue
+                constant = _constant(value, project, pending)
+                if constant is not None:
+                    digest.update(f'{function.__module__}.{name}={constant}'.encode())
+    return digest.hexdigest()
+
+
+class ReportCache:
+    """Cache de seções de relatório, indexado pela impressão digital do dataset e pela versão do código.
+
+    O dataset só é carregado se alguma seção não estiver no cache.
+    """
+
+    def __init__(self, report, path=DATASET_PATH, filters=None, cache_dir=CACHE_DIR, df=None):
+        self.path = path
+        self.filters = filters
+        self.cache_dir = os.path.join(cache_dir, report)
+        self.key = dataset_key(path, filters)
+        self.fingerprint = dataset_fingerprint(path, filters, cache_dir)
+        self._df = df  # dataset já carregado (o dashboard), para não relê-lo numa falha do cache
+
+    @property
+    def df(self):
+        if self._df is None:
+            self._df = load_dataset(self.path, self.filters)
+        return self._df
+
+    def section(self, func, source=None, **params):
+        """Resultado de `func` aplicada ao dataset, ou aos dados de `source()` quando informado
+        (por exemplo CustomerStore.load para seções em granularidade de cliente).
+        `params` são repassados à seção e fazem parte da chave do cache."""
+        name = func.__name__
+        version = code_version(func)
+        if source is not None or params:
+            extra = code_version(source) if source is not None else ''
+            extra += json.dumps(params, sort_keys=True, default=str)
+            version = hashlib.blake2b((version + extra).encode(), digest_size=16).hexdigest()
+        entry = os.path.join(self.cache_dir, f'{name}-{self.key}-{self.fingerprint}-{version}.pkl')
+        try:
+            with open(entry, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:  # ainda não calculada, ou removida por outro processo
+            pass
+
+        result = func(self.df if source is None else source(), **params)
+        self._evict(name)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = entry + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, entry)
+        return result
+
+    # Remove as entradas antigas da seção para a mesma origem (caminho e filtros): outra versão
+    # do conteúdo ou do código. Entradas de outros filtros continuam válidas e ficam
+    def _evict(self, name):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.rsplit('-', 2)[0] == f'{name}-{self.key}':
+                try:
+                    os.remove(os.path.join(self.cache_dir, file_name))
+                except FileNotFoundError:  # já removida por outro processo
+                    pass
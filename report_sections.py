@@ -0,0 +1,286 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from correlation import METHODS, frame_stats
+from periods import PERIOD_COLUMNS, compare, parse_period, period_aggregates
+from pricing_cube import PricingCube
+from significance import bootstrap_mean, bootstrap_rate, chi_square
+
+# Seções de relatório usadas por EDA.py, data_stats.py e data_analysis.py.
+# Cada função recebe o DataFrame completo (ou a tabela de clientes, nas seções
+# em granularidade de cliente) e retorna apenas o resultado calculado;
+# a impressão fica nos scripts. Os resultados são guardados pelo ReportCache
+# (report_cache.py), então cada função deve depender apenas do DataFrame recebido.
+
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+WEEKENDS = ['Saturday', 'Sunday']
+
+
+# Visão geral do dataset (head, colunas, info, estatísticas e valores ausentes)
+def dataset_overview(df):
+    info = io.StringIO()
+    df.info(buf=info)
+    return {
+        'head': df.head(),
+        'columns': df.columns,
+        'info': info.getvalue(),
+        'describe': df[['quantity', 'price', 'order_frequency', 'rating_date']].describe(),
+        'total_missing_values': df.isnull().sum().sum(),
+        'nunique': df.nunique()
+    }
+
+
+# Estatísticas descritivas de todas as colunas numéricas
+def describe(df):
+    return df.describe()
+
+
+# Estatísticas gerais do dataset inteiro
+def overall_stats(df):
+    return {
+        'cities': df['city'].unique(),
+        'restaurants': df['restaurant_name'].unique(),
+        'dishes': df['dish_name'].unique(),
+        'categories': df['category'].unique(),
+        'average_rating': df['rating'].mean(),
+        'average_order_frequency': df['order_frequency'].mean(),
+        'payment_methods': df['payment_method'].value_counts()
+    }
+
+
+# Métricas de um grupo de pedidos (cidade, faixa etária, ...)
+def group_metrics(data):
+    return {
+        'num_orders': len(data),
+        'num_restaurants': data['restaurant_name'].nunique(),
+        'num_dishes': data['dish_name'].nunique(),
+        'num_categories': data['category'].nunique(),
+        'avg_rating': data['rating'].mean(),
+        'avg_order_freq': data['order_frequency'].mean(),
+        'num_order_freq': data['order_frequency'].sum(),
+        'avg_price': data['price'].mean(),
+        'total_spent': data['price'].sum(),
+        'num_inactive': (data['churned'] == 'Inactive').sum(),
+        'num_active': (data['churned'] == 'Active').sum(),
+        'num_cancellations': (data['delivery_status'] == 'Cancelled').sum(),
+        'top_payment_method': data['payment_method'].value_counts().head(1).index[0],
+        'top_restaurant': data['restaurant_name'].value_counts().head(1).index[0],
+        'top_category': data['category'].value_counts().head(1).index[0],
+        'top_dish': data['dish_name'].value_counts().head(1).index[0]
+    }
+
+
+# Valor mais frequente de `column` em cada grupo; empates ficam com o valor que aparece
+# primeiro, como em value_counts().head(1)
+def _group_mode(df, keys, column):
+    counts = df.groupby(keys + [column], sort=False).size()
+    counts = counts.iloc[np.argsort(-counts.to_numpy(), kind='stable')]
+    # Nível do valor é o último (pode repetir o nome de uma das chaves)
+    top = counts[~counts.index.droplevel(-1).duplicated()]
+    return pd.Series(top.index.get_level_values(-1), index=top.index.droplevel(-1))
+
+
+def grouped_metrics(df, keys):
+    """As métricas de group_metrics para todos os grupos de `keys` em uma passada de groupby.
+
+    Uma linha por grupo, na ordem em que os grupos aparecem no dataset.
+    """
+    groups = df.groupby(keys, sort=False)
+    metrics = pd.DataFrame({'num_orders': groups.size()})
+    for name, column in (('num_restaurants', 'restaurant_name'), ('num_dishes', 'dish_name'),
+                         ('num_categories', 'category')):
+        metrics[name] = groups[column].nunique()
+    metrics['avg_rating'] = groups['rating'].mean()
+    metrics['avg_order_freq'] = groups['order_frequency'].mean()
+    metrics['num_order_freq'] = groups['order_frequency'].sum()
+    metrics['avg_price'] = groups['price'].mean()
+    metrics['total_spent'] = groups['price'].sum()
+    key_columns = [df[key] for key in keys]
+    metrics['num_inactive'] = df['churned'].eq('Inactive').groupby(key_columns, sort=False).sum()
+    metrics['num_active'] = df['churned'].eq('Active').groupby(key_columns, sort=False).sum()
+    metrics['num_cancellations'] = df['delivery_status'].eq('Cancelled').groupby(key_columns, sort=False).sum()
+    for name, column in (('top_payment_method', 'payment_method'), ('top_restaurant', 'restaurant_name'),
+                         ('top_category', 'category'), ('top_dish', 'dish_name')):
+        metrics[name] = _group_mode(df, keys, column)
+    return metrics
+
+
+# Métricas por cidade (na ordem em que as cidades aparecem no dataset)
+def city_stats(df):
+    return {city: group_metrics(city_data) for city, city_data in df.groupby('city', sort=False)}
+
+
+# Métricas por faixa etária (na ordem em que as faixas aparecem no dataset)
+def age_stats(df):
+    return {age: group_metrics(age_data) for age, age_data in df.groupby('age', sort=False)}
+
+
+# Resumo consolidado por cidade
+def city_summary(df):
+    return df.groupby('city').agg(
+        num_restaurants=('restaurant_name', 'nunique'),
+        num_dishes=('dish_name', 'nunique'),
+        num_categories=('category', 'nunique'),
+        avg_rating=('rating', 'mean'),
+        avg_order_freq=('order_frequency', 'mean'),
+        total_amount_spent=('price', 'sum'),
+        avg_price_per_order=('price', 'mean'),
+
+        # Para as colunas categóricas mais populares, usamos uma função lambda
+        most_popular_restaurant=('restaurant_name', lambda x: x.mode()[0]),
+        most_popular_category=('category', lambda x: x.mode()[0]),
+        most_popular_dish=('dish_name', lambda x: x.mode()[0]),
+        most_popular_payment_method=('payment_method', lambda x: x.mode()[0])
+    )
+
+
+# Valor médio de cada prato
+def dish_mean_price(df):
+    return df.groupby('dish_name')['price'].mean().sort_values(ascending=False)
+
+
+# Preço médio de cada prato em cada restaurante (cubo restaurante x prato x cidade)
+def dish_price_by_restaurant(df):
+    cube = PricingCube.from_frame(df)
+    return cube.marginal('dish_name', 'restaurant_name')['avg_price'].unstack('restaurant_name')
+
+
+# Faixas de preço (quartis) do valor médio de cada pedido
+def order_price_bands(df):
+    avg_order_price = df.groupby('order_id')['price'].mean()
+    q1 = avg_order_price.quantile(0.25)
+    median = avg_order_price.quantile(0.50)
+    q3 = avg_order_price.quantile(0.75)
+
+    def categorize_price(price):
+        if price <= q1:
+            return 'Baixo (Q1)'
+        elif price <= median:
+            return 'Médio-Baixo (Q2)'
+        elif price <= q3:
+            return 'Médio-Alto (Q3)'
+        else:
+            return 'Alto (Q4)'
+
+    order_price_category = avg_order_price.apply(categorize_price)
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'summary': avg_order_price.groupby(order_price_category).agg(['mean', 'sum'])
+    }
+
+
+# Padrão de pedidos por mês
+def monthly_orders(df):
+    return df['order_month'].value_counts()
+
+
+# Valor médio gasto por faixa etária, método de pagamento e gênero
+def spend_by_age(df):
+    return df.groupby('age')['price'].mean().sort_values(ascending=False)
+
+
+def spend_by_payment_method(df):
+    return df.groupby('payment_method')['price'].mean().sort_values(ascending=False)
+
+
+def spend_by_gender(df):
+    return df.groupby('gender')['price'].mean().sort_values(ascending=False)
+
+
+# Frequência dos métodos de pagamento e clientes ativos vs inativos
+def payment_counts(df):
+    return df['payment_method'].value_counts()
+
+
+# Seções em granularidade de cliente: recebem a tabela de clientes (customers.py)
+# Clientes ativos vs inativos (um cliente conta uma vez, não uma vez por pedido)
+def churn_counts(profiles):
+    return profiles['churned'].value_counts()
+
+
+# Número de clientes, inativos e ativos por faixa etária
+def customers_by_age(profiles):
+    return pd.DataFrame({
+        'customers': profiles.groupby('age').size(),
+        'inactive': profiles['churned'].eq('Inactive').groupby(profiles['age']).sum(),
+        'active': profiles['churned'].eq('Active').groupby(profiles['age']).sum()
+    })
+
+
+# Relação entre status do pedido e clientes inativos
+def cancellation_churn(df):
+    contingency_table = pd.crosstab(df['delivery_status'], df['churned'])
+    return {
+        'contingency_table': contingency_table,
+        'cross_tab': pd.crosstab(df['delivery_status'], df['churned'], margins=True),
+        'proportions': contingency_table.div(contingency_table.sum(axis=1), axis=0),
+        'cancelled_inactive': len(df[(df['delivery_status'] == 'Cancelled') & (df['churned'] == 'Inactive')]),
+        'total_cancelled': len(df[df['delivery_status'] == 'Cancelled']),
+        'total_inactive': len(df[df['churned'] == 'Inactive'])
+    }
+
+
+# Estatísticas suficientes da correlação (Pearson e Spearman) entre as colunas numéricas e codificadas
+def correlation_stats(df):
+    return {method: frame_stats(df, method) for method in METHODS}
+
+
+# Comparação lado a lado de dois períodos (ano, mês ou intervalo de datas) com as variações
+def period_comparison(df, periods):
+    base, other = [parse_period(period).label for period in periods]
+    return compare(period_aggregates(df[PERIOD_COLUMNS], [base, other]), base, other)
+
+
+# Teste qui-quadrado e V de Cramér da tabela status de entrega x churned
+def cancellation_churn_test(df):
+    return chi_square(pd.crosstab(df['delivery_status'], df['churned']))
+
+
+# Intervalos de confiança bootstrap (95%) das principais taxas e médias por grupo
+def bootstrap_intervals(df):
+    return {
+        'cancellation_rate_by_age': bootstrap_rate(df['delivery_status'] == 'Cancelled', df['age']) * 100,
+        'spend_by_gender': bootstrap_mean(df['price'], df['gender']),
+        'spend_by_payment_method': bootstrap_mean(df['price'], df['payment_method']),
+        'rating_by_city': bootstrap_mean(df['rating'], df['city'])
+    }
+
+
+# Relação entre dias da semana e número de pedidos
+def orders_by_day(df):
+    day_col = 'order_day_of_week'
+    result = {
+        'total_orders': len(df),
+        'orders_by_day': df[day_col].value_counts(),
+        'day_status': pd.crosstab(df[day_col], df['delivery_status'], margins=True),
+        'weekday_orders': None,
+        'weekend_orders': None
+    }
+    if all(day in df[day_col].values for day in WEEKDAYS + WEEKENDS):
+        result['weekday_orders'] = df[df[day_col].isin(WEEKDAYS)].shape[0]
+        result['weekend_orders'] = df[df[day_col].isin(WEEKENDS)].shape[0]
+    return result
+
+
+# Cancelamentos por faixa etária
+def cancellations_by_age(df):
+    ages = df['age']
+    # Criar faixas etárias se necessário (caso a idade seja numérica)
+    if ages.dtype in ['int64', 'float64']:
+        ages = pd.cut(ages,
+                      bins=[0, 18, 25, 35, 45, 55, 65, 100],
+                      labels=['<18', '18-24', '25-34', '35-44', '45-54', '55-64', '65+'])
+    cancelled = df['delivery_status'] == 'Cancelled'
+    return {
+        'total_orders': len(df),
+        'total_cancelled': int(cancelled.sum()),
+        'orders_by_age': ages.value_counts().sort_index(),
+        'cancelled_by_age': ages[cancelled].value_counts().sort_index(),
+        'age_status': pd.crosstab(ages, df['delivery_status'], margins=True),
+        'age_status_pct': pd.crosstab(ages, df['delivery_status'], normalize='index') * 100
+    }
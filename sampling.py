@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_store import DatasetView
+
+# Colunas usadas para estratificar a amostra do modo prévia
+STRATA_COLUMNS = ('city', 'age', 'delivery_status')
+# Quantidade aproximada de agregações feitas em uma execução do dashboard
+AGGREGATIONS_PER_RUN = 25
+# Valor z para intervalos de confiança de 95%
+Z_95 = 1.96
+
+
+# Estima quantas linhas por segundo uma agregação típica processa neste servidor
+# (mediana de algumas medições, para uma pausa isolada não mudar o tamanho da amostra)
+def rows_per_second(dataset, probe_rows=200_000, runs=3):
+    n = min(len(dataset), probe_rows)
+    frame = dataset.df[['city', 'price']].iloc[:n]
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        frame.groupby('city')['price'].sum()
+        timings.append(time.perf_counter() - start)
+    return n / max(float(np.median(timings)), 1e-6)
+
+
+# Tamanho da amostra que cabe no orçamento de latência (em milissegundos) de uma execução
+def sample_size_for_budget(dataset, budget_ms):
+    per_aggregation = budget_ms / 1000 / AGGREGATIONS_PER_RUN
+    return int(min(len(dataset), per_aggregation * rows_per_second(dataset)))
+
+
+class StratifiedSample:
+    """Amostra estratificada (alocação proporcional) do SharedDataset.
+
+    Cada linha da amostra tem peso N_h / n_h do seu estrato. Os intervalos de confiança
+    usam o estimador de domínio (linearização), então continuam válidos depois dos filtros.
+    """
+
+    def __init__(self, dataset, size, columns=STRATA_COLUMNS, min_per_stratum=2, seed=0):
+        self.dataset = dataset
+        # Estrato de cada linha: combinação dos códigos das colunas de estratificação
+        strata = np.zeros(len(dataset), dtype=np.int64)
+        for column in columns:
+            codes, uniques = dataset.codes(column)
+            strata = strata * (len(uniques) + 1) + (codes + 1)
+        strata = np.unique(strata, return_inverse=True)[1]
+
+        population = np.bincount(strata)
+        allocation = np.round(size * population / len(dataset)).astype(np.int64)
+        sizes = np.minimum(population, np.maximum(allocation, min_per_stratum))
+
+        # Sorteio sem reposição dentro de cada estrato: ordena por (estrato, chave aleatória)
+        rng = np.random.default_rng(seed)
+        order = np.lexsort((rng.random(len(dataset)), strata))
+        starts = np.concatenate(([0], np.cumsum(population)[:-1]))
+        rank = np.arange(len(dataset)) - starts[strata[order]]
+        chosen = order[rank < sizes[strata[order]]]
+
+        self.rows = np.sort(chosen)
+        self.strata = strata[self.rows]
+        self.population = population
+        self.sizes = sizes
+        self.weights = (population / sizes)[self.strata]
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def is_exact(self):
+        return len(self.rows) == len(self.dataset)
+
+    def select(self, **filters):
+        """DatasetView (com pesos) das linhas da amostra que passam pelos filtros"""
+        mask = self.dataset.mask(self.rows, **filters)
+        if mask is None:
+            mask = np.ones(len(self.rows), dtype=bool)
+        return DatasetView(self.dataset, self.rows[mask], self.weights[mask], sample_mask=mask)
+
+    def values(self, column):
+        return self.dataset.df[column].take(self.rows).to_numpy()
+
+    # Variância de um total estimado, a partir dos valores z de cada linha da amostra
+    def _total_variance(self, z):
+        n = self.sizes
+        total = np.bincount(self.strata, weights=z, minlength=len(n))
+        total_sq = np.bincount(self.strata, weights=z * z, minlength=len(n))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s2 = np.where(n > 1, (total_sq - total ** 2 / n) / (n - 1), 0.0)
+        fpc = 1 - n / self.population
+        return max(np.sum(self.population ** 2 * fpc * s2 / n), 0.0)
+
+    def total_ci(self, view, value=None, z=Z_95):
+        """Total estimado (contagem se value=None) e a meia-largura do intervalo de confiança"""
+        y = view.sample_mask.astype(float)
+        if value is not None:
+            y = y * (self.values(value) if isinstance(value, str) else value)
+        estimate = np.dot(self.weights, y)
+        return estimate, z * np.sqrt(self._total_variance(y))
+
+    def mean_ci(self, view, value, by=None, z=Z_95):
+        """Média estimada no domínio filtrado e a meia-largura do intervalo de confiança.
+
+        `value` é o nome de uma coluna ou um array alinhado às linhas da amostra (ex.: um
+        indicador 0/1 para taxas). Com `by`, retorna um DataFrame com uma linha por grupo.
+        """
+        y = self.values(value) if isinstance(value, str) else np.asarray(value, dtype=float)
+        if by is None:
+            return self._domain_mean(view.sample_mask, y, z)
+        keys = self.values(by)
+        groups = pd.unique(keys[view.sample_mask])
+        result = pd.DataFrame(
+            [self._domain_mean(view.sample_mask & (keys == group), y, z) for group in groups],
+            index=pd.Index(groups, name=by),
+            columns=['mean', 'ci']
+        )
+        return result
+
+    def _domain_mean(self, domain, y, z):
+        size = np.dot(self.weights, domain)
+        if size == 0:
+            return np.nan, np.nan
+        mean = np.dot(self.weights, domain * y) / size
+        linearized = domain * (y - mean) / size
+        return mean, z * np.sqrt(self._total_variance(linearized))
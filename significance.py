@@ -0,0 +1,159 @@
+import argparse
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_store import add_dataset_arguments, dataset_filters, load_dataset
+
+try:
+    from scipy import stats as scipy_stats
+except ImportError:  # scipy é opcional: sem ele, o p-valor usa a aproximação de Wilson-Hilferty
+    scipy_stats = None
+
+# Número de réplicas bootstrap e nível de confiança dos intervalos
+N_BOOTSTRAP = 2000
+CONFIDENCE = 0.95
+# Tamanho máximo (réplicas x linhas) de cada matriz de reamostragem, para limitar a memória
+MAX_CELLS = 1 << 22
+
+
+# P(X > stat) para X ~ qui-quadrado com `dof` graus de liberdade
+def chi2_sf(stat, dof):
+    if scipy_stats is not None:
+        return float(scipy_stats.chi2.sf(stat, dof))
+    # Formas fechadas para 1 e 2 graus de liberdade (tabelas 2x2 e 2x3)
+    if dof == 1:
+        return math.erfc(math.sqrt(stat / 2))
+    if dof == 2:
+        return math.exp(-stat / 2)
+    # Wilson-Hilferty: (X/k)^(1/3) é aproximadamente normal
+    z = ((stat / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def chi_square(table):
+    """Teste qui-quadrado de independência e V de Cramér de uma tabela de contingência.
+
+    Com uma única linha ou coluna (por exemplo, um filtro que deixa só uma cidade), não há
+    o que testar: estatística, p-valor e V ficam NaN.
+    """
+    observed = np.asarray(table, dtype=float)
+    if min(observed.shape) < 2:
+        return {'chi2': np.nan, 'dof': 0, 'p_value': np.nan, 'cramers_v': np.nan}
+    n = observed.sum()
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / n
+    stat = ((observed - expected) ** 2 / expected).sum()
+    dof = (observed.shape[0] - 1) * (observed.shape[1] - 1)
+    return {
+        'chi2': stat,
+        'dof': dof,
+        'p_value': chi2_sf(stat, dof),
+        'cramers_v': math.sqrt(stat / (n * (min(observed.shape) - 1)))
+    }
+
+
+# Limites do intervalo percentil de uma matriz (réplicas x grupos)
+def _percentile_interval(replicates, confidence):
+    alpha = (1 - confidence) / 2 * 100
+    return np.percentile(replicates, [alpha, 100 - alpha], axis=0)
+
+
+def _interval_frame(labels, estimate, replicates, confidence):
+    low, high = _percentile_interval(replicates, confidence)
+    return pd.DataFrame({'estimate': estimate, 'ci_low': low, 'ci_high': high}, index=labels)
+
+
+def bootstrap_rate(flags, groups, n_boot=N_BOOTSTRAP, confidence=CONFIDENCE, seed=0):
+    """Intervalo bootstrap da proporção de `flags` verdadeiros em cada grupo.
+
+    Reamostrar n linhas de 0/1 equivale a sortear Binomial(n, p) / n, então todas as
+    réplicas de todos os grupos saem de uma única chamada vetorizada.
+    """
+    codes, labels = pd.factorize(groups, sort=True)
+    flags = np.asarray(flags, dtype=float)[codes >= 0]
+    codes = codes[codes >= 0]
+    counts = np.bincount(codes, minlength=len(labels))
+    rate = np.bincount(codes, weights=flags, minlength=len(labels)) / counts
+    rng = np.random.default_rng(seed)
+    replicates = rng.binomial(counts, rate, size=(n_boot, len(labels))) / counts
+    return _interval_frame(labels, rate, replicates, confidence)
+
+
+# Médias por grupo de `n_boot` réplicas: uma matriz (réplicas x linhas) de índices sorteados
+# dentro de cada grupo, somada por grupo com reduceat
+def _bootstrap_chunk(sorted_values, counts, n_boot, seed):
+    if not len(sorted_values):
+        return np.empty((n_boot, len(counts)))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    row_starts = np.repeat(starts, counts)
+    row_counts = np.repeat(counts, counts)
+    rng = np.random.default_rng(seed)
+    means = []
+    step = max(1, MAX_CELLS // len(sorted_values))
+    for done in range(0, n_boot, step):
+        size = min(step, n_boot - done)
+        picks = row_starts + (rng.random((size, len(sorted_values))) * row_counts).astype(np.int64)
+        means.append(np.add.reduceat(sorted_values[picks], starts, axis=1) / counts)
+    return np.concatenate(means)
+
+
+def bootstrap_mean(values, groups, n_boot=N_BOOTSTRAP, confidence=CONFIDENCE, seed=0, workers=1):
+    """Intervalo bootstrap da média de `values` em cada grupo (reamostragem dentro do grupo).
+
+    `workers` > 1 divide as réplicas entre processos; cada bloco tem sua própria semente
+    (SeedSequence.spawn), então o resultado não depende do número de processos.
+    """
+    values = np.asarray(values, dtype=float)
+    groups = pd.Series(groups)
+    # Só as linhas com valor e com grupo (avaliações em branco ficam fora da média e um grupo
+    # sem nenhum valor não aparece)
+    present = ~np.isnan(values) & groups.notna().to_numpy()
+    codes, labels = pd.factorize(groups[present], sort=True)
+    values = values[present]
+    order = np.argsort(codes, kind='stable')
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=len(labels))
+    estimate = np.bincount(codes, weights=values, minlength=len(labels)) / counts
+
+    blocks = workers * 4 if workers > 1 else 1
+    sizes = [len(part) for part in np.array_split(np.arange(n_boot), blocks)]
+    seeds = np.random.SeedSequence(seed).spawn(blocks)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_bootstrap_chunk, [sorted_values] * blocks, [counts] * blocks, sizes, seeds))
+    else:
+        chunks = [_bootstrap_chunk(sorted_values, counts, size, block_seed)
+                  for size, block_seed in zip(sizes, seeds)]
+    return _interval_frame(labels, estimate, np.concatenate(chunks), confidence)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Testes de significância e intervalos bootstrap')
+    parser.add_argument('--replicates', type=int, default=N_BOOTSTRAP)
+    parser.add_argument('--workers', type=int, default=1, help='Processos para as réplicas bootstrap')
+    args = add_dataset_arguments(parser).parse_args()
+    df = load_dataset(args.dataset, dataset_filters(args))
+
+    pd.set_option('display.width', None)
+    test = chi_square(pd.crosstab(df['delivery_status'], df['churned']))
+    print("delivery_status x churned:")
+    print(f"chi2 = {test['chi2']:.2f} (dof = {test['dof']}), p = {test['p_value']:.4f}, "
+          f"Cramér's V = {test['cramers_v']:.4f}")
+
+    start = time.perf_counter()
+    intervals = {
+        'Cancellation rate by age (%)': bootstrap_rate(df['delivery_status'] == 'Cancelled', df['age'],
+                                                      args.replicates) * 100,
+        'Spend by gender': bootstrap_mean(df['price'], df['gender'], args.replicates, workers=args.workers),
+        'Spend by payment method': bootstrap_mean(df['price'], df['payment_method'], args.replicates,
+                                                  workers=args.workers),
+        'Average rating by city': bootstrap_mean(df['rating'], df['city'], args.replicates, workers=args.workers)
+    }
+    elapsed = time.perf_counter() - start
+    for name, frame in intervals.items():
+        print(f"\n{name}:")
+        print(frame.round(2))
+    print(f"\n{args.replicates:,} réplicas por análise em {elapsed:.2f} s")
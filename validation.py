@@ -0,0 +1,351 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import ingest
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # sem pyarrow, os códigos das colunas de texto saem do pd.factorize
+    pa = None
+
+# Arquivos com as linhas rejeitadas (um por arquivo de origem)
+QUARANTINE_DIR = '.quarantine'
+# Arquivos já validados sem violações (dentro de QUARANTINE_DIR): tamanho/data, versão das regras e linhas
+VALIDATED_FILE = 'validated.json'
+
+# Colunas que não podem faltar (identificação do pedido e valores usados em todos os relatórios);
+# ausências nas demais colunas não tiram a linha da carga
+REQUIRED_COLUMNS = ('customer_id', 'order_id', 'order_date', 'restaurant_name', 'dish_name',
+                    'city', 'quantity', 'price', 'delivery_status')
+# Matriz de contagem dos pares (rótulo, código) densa até este número de células
+DENSE_PAIRS = 1 << 22
+
+# Colunas de rótulo e os seus códigos (codificação uma para uma)
+CODED_COLUMNS = {
+    'city': 'city_cod', 'dish_name': 'dish_name_cod', 'category': 'category_cod',
+    'gender': 'gender_cod', 'last_order_date': 'last_order_date_cod', 'churned': 'churned_cod',
+    'delivery_status': 'delivery_status_cod', 'payment_method': 'payment_method_cod'
+}
+DATE_COLUMNS = ('signup_date', 'order_date', 'last_order_date', 'rating_date')
+DATE_FORMAT = '%Y-%m-%d'
+# Intervalos válidos (inclusivos; None = sem limite)
+RANGES = {
+    'quantity': (1, None), 'price': (0, None), 'rating': (1, 5),
+    'order_frequency': (1, None), 'loyalty_points': (0, None)
+}
+# Colunas derivadas das datas: coluna -> (coluna de data, componente)
+DERIVED_COLUMNS = {
+    'signup_year': ('signup_date', 'year'), 'signup_month': ('signup_date', 'month_name'),
+    'order_year': ('order_date', 'year'), 'order_month': ('order_date', 'month_name'),
+    'order_day_of_week': ('order_date', 'day_name')
+}
+
+
+class _Columns:
+    """Códigos e datas de cada coluna, calculados uma vez e usados por todas as regras.
+
+    Colunas de texto já lidas pelo pyarrow são codificadas sobre os próprios buffers do Arrow
+    (dictionary_encode, sem cópia para objetos Python); inteiros em uma faixa curta usam o
+    próprio valor como código.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._codes = {}
+        self._dates = {}
+
+    def codes(self, column):
+        if column not in self._codes:
+            values = self.df[column]
+            if values.dtype.kind == 'i' and len(values) and values.max() - values.min() < len(values):
+                # Inteiros em uma faixa curta: o próprio valor (deslocado) é o código, sem hash
+                low = values.min()
+                self._codes[column] = (values.to_numpy() - low, np.arange(low, values.max() + 1))
+            elif pa is not None and isinstance(values.dtype, pd.StringDtype) and values.dtype.storage == 'pyarrow':
+                self._codes[column] = _arrow_codes(values)
+            else:
+                self._codes[column] = pd.factorize(values)
+        return self._codes[column]
+
+    def dates(self, column):
+        # Cada data distinta é convertida uma única vez; -1 (ausente) aponta para o NaT do final
+        if column not in self._dates:
+            codes, uniques = self.codes(column)
+            dates = pd.to_datetime(pd.Index(uniques), format=DATE_FORMAT, errors='coerce')
+            self._dates[column] = (codes, dates.append(pd.DatetimeIndex([pd.NaT])))
+        return self._dates[column]
+
+
+# Códigos de uma coluna de texto do Arrow: um dicionário para todos os blocos, -1 nos nulos
+def _arrow_codes(values):
+    encoded = pc.dictionary_encode(pa.array(values.array))
+    chunks = encoded.chunks if isinstance(encoded, pa.ChunkedArray) else [encoded]
+    if not chunks:
+        return np.zeros(0, dtype=np.int64), pd.Index([], dtype=values.dtype)
+    # Sem nulos, os índices do Arrow são lidos sem cópia
+    codes = [(pc.fill_null(chunk.indices, -1) if chunk.null_count else chunk.indices).to_numpy() for chunk in chunks]
+    uniques = pd.Index(chunks[0].dictionary.to_pandas(), dtype=values.dtype)
+    return (codes[0] if len(codes) == 1 else np.concatenate(codes)), uniques
+
+
+# Linhas cujo par (rótulo, código) não é o par mais frequente do rótulo e do código.
+# Com poucos rótulos e códigos, as contagens ficam em uma matriz densa (empate: menor código)
+# e a máscara por linha só é montada se algum par fora da maioria aparece; senão, os pares
+# são numerados (empate: o par que aparece primeiro)
+def _pair_mismatch(first, second):
+    if not len(first):
+        return np.zeros(0, dtype=bool)
+    complete = first.min() >= 0 and second.min() >= 0  # sem ausentes (o caso comum): sem máscaras
+    valid = None if complete else (first >= 0) & (second >= 0)
+    if not complete and not valid.any():
+        return valid
+    shape = (int(first.max()) + 1, int(second.max()) + 1)
+    pair_key = first.astype(np.int64) * shape[1] + second
+    if not complete:
+        pair_key[~valid] = -1
+    if shape[0] * shape[1] <= DENSE_PAIRS:
+        counts = np.bincount(pair_key if complete else pair_key[valid],
+                             minlength=shape[0] * shape[1]).reshape(shape)
+        good = np.zeros(shape, dtype=bool)
+        good[np.arange(shape[0]), counts.argmax(axis=1)] = True
+        good &= np.arange(shape[0])[:, None] == counts.argmax(axis=0)
+        if not counts[~good].any():
+            return np.zeros(len(first), dtype=bool)
+        bad = ~good.ravel().take(pair_key if complete else np.maximum(pair_key, 0))
+        return bad if complete else bad & valid
+
+    pairs, pair_values = pd.factorize(pair_key, use_na_sentinel=False)
+    counts = np.bincount(pairs, minlength=len(pair_values))
+    counts[pair_values < 0] = -1  # linhas com valor ausente não disputam a maioria
+    order = np.argsort(-counts, kind='stable')
+    good = np.ones(len(pair_values), dtype=bool)
+    for side in (pair_values // shape[1], pair_values % shape[1]):
+        majority = np.zeros(len(pair_values), dtype=bool)
+        majority[order[np.unique(side[order], return_index=True)[1]]] = True
+        good &= majority
+    return (first >= 0) & (second >= 0) & ~good[pairs]
+
+
+def check(df):
+    """Aplica todas as regras em uma passada; retorna {(regra, coluna): máscara das linhas inválidas}.
+
+    Só entram as regras com alguma violação. Cada coluna é codificada (e cada data distinta
+    convertida) uma única vez, então as regras comparam vetores de inteiros.
+    """
+    columns = _Columns(df)
+    violations = {}
+
+    def add(rule, column, mask):
+        if mask.any():
+            violations[(rule, column)] = mask
+
+    # Cada regra resume a coluna primeiro (ausentes, datas distintas inválidas, mínimo e máximo,
+    # contagens dos pares); a máscara por linha só é montada quando há violação
+    for column in REQUIRED_COLUMNS:
+        if column in df.columns and df[column].hasnans:
+            add('missing', column, df[column].isna().to_numpy())
+
+    for label, coded in CODED_COLUMNS.items():
+        if label in df.columns and coded in df.columns:
+            add('code_mismatch', coded, _pair_mismatch(columns.codes(label)[0], columns.codes(coded)[0]))
+
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            codes, dates = columns.dates(column)
+            if dates[:-1].hasnans:
+                add('invalid_date', column, (codes >= 0) & dates.isna()[codes])
+
+    for column, (low, high) in RANGES.items():
+        if column in df.columns:
+            values = df[column].to_numpy()  # tipo já convertido na leitura (NaN fica fora das comparações)
+            if not len(values) or (values.min() >= (low if low is not None else -np.inf)
+                                   and values.max() <= (high if high is not None else np.inf)):
+                continue  # com NaN, min/max são NaN e as comparações abaixo decidem
+            out = np.zeros(len(values), dtype=bool)
+            if low is not None:
+                out |= values < low
+            if high is not None:
+                out |= values > high
+            add('out_of_range', column, out)
+
+    for column, (date_column, part) in DERIVED_COLUMNS.items():
+        if column in df.columns and date_column in df.columns:
+            codes, dates = columns.dates(date_column)
+            derived_codes, derived_values = columns.codes(column)
+            expected = dates.year if part == 'year' else getattr(dates, part)()
+            # Código, na coluna derivada, do valor esperado para cada data distinta
+            expected_codes = pd.Index(derived_values).get_indexer(expected)
+            add('derived_mismatch', column,
+                dates.notna()[codes] & (expected_codes[codes] != derived_codes))
+    return violations
+
+
+def summarize(df, violations):
+    """Resumo das violações: linhas afetadas e exemplos de valores por regra e coluna"""
+    rows = [
+        {
+            'rule': rule,
+            'column': column,
+            'rows': int(mask.sum()),
+            'pct': mask.mean() * 100,
+            'examples': ', '.join(map(str, pd.unique(df[column].to_numpy()[mask])[:3]))
+        }
+        for (rule, column), mask in violations.items()
+    ]
+    return pd.DataFrame(rows, columns=['rule', 'column', 'rows', 'pct', 'examples'])
+
+
+def invalid_rows(violations, size):
+    mask = np.zeros(size, dtype=bool)
+    for rule_mask in violations.values():
+        mask |= rule_mask
+    return mask
+
+
+# Arquivo de quarentena de um arquivo de origem (nome legível + hash do caminho completo)
+def quarantine_path(source, quarantine_dir=QUARANTINE_DIR):
+    digest = hashlib.blake2b(os.path.abspath(source).encode(), digest_size=4).hexdigest()
+    name = os.path.basename(source).split('.')[0]
+    return os.path.join(quarantine_dir, f'{name}-{digest}.csv')
+
+
+def quarantine(df, violations, path, append=False):
+    """Grava as linhas inválidas com a lista das regras violadas (coluna `violations`)"""
+    mask = invalid_rows(violations, len(df))
+    reasons = pd.Series('', index=df.index[mask])
+    for (rule, column), rule_mask in violations.items():
+        reasons[rule_mask[mask]] += f'{rule}:{column};'
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    rejected = df[mask].assign(violations=reasons.str.rstrip(';').to_numpy())
+    rejected.to_csv(path, mode='a' if append else 'w', header=not (append and os.path.exists(path)), index=False)
+
+
+# Hash das regras (este módulo) e da leitura (ingest.py), calculado uma vez por processo
+_rules_version = None
+
+
+def rules_version():
+    global _rules_version
+    if _rules_version is None:
+        digest = hashlib.blake2b(digest_size=16)
+        for module in (sys.modules[__name__], ingest):
+            digest.update(inspect.getsource(module).encode())
+        _rules_version = digest.hexdigest()
+    return _rules_version
+
+
+def _read_validated(quarantine_dir):
+    path = os.path.join(quarantine_dir, VALIDATED_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_validated(validated, quarantine_dir):
+    os.makedirs(quarantine_dir, exist_ok=True)
+    path = os.path.join(quarantine_dir, VALIDATED_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(validated, f)
+    os.replace(path + '.tmp', path)
+
+
+# Marca do arquivo validado: tamanho, data de modificação, versão das regras e número de linhas
+def _validation_stamp(source, rows):
+    stat = os.stat(source)
+    return [stat.st_size, stat.st_mtime_ns, rules_version(), rows]
+
+
+def validate(df, source=None, append=False, quarantine_dir=QUARANTINE_DIR, remember=False):
+    """Etapa de validação da carga: retorna o DataFrame sem as linhas inválidas.
+
+    As linhas rejeitadas vão para o arquivo de quarentena de `source` e um resumo curto
+    é impresso em stderr. Sem violações, o DataFrame é devolvido sem cópia.
+    `append` acrescenta ao arquivo de quarentena (blocos seguintes de uma leitura em streaming).
+    `remember` (quando `df` é o arquivo `source` inteiro) guarda em VALIDATED_FILE que o arquivo
+    passou sem violações: enquanto o arquivo e as regras não mudam, as cargas seguintes não
+    repetem as regras.
+    """
+    key = os.path.abspath(source) if remember and source is not None else None
+    if key is not None:
+        stamp = _validation_stamp(source, len(df))
+        validated = _read_validated(quarantine_dir)
+        if validated.get(key) == stamp:
+            return df
+
+    violations = check(df)
+    path = quarantine_path(source or 'dataset', quarantine_dir)
+    if key is not None and (validated.get(key) is not None or not violations):
+        if violations:
+            del validated[key]
+        else:
+            validated[key] = stamp
+        _write_validated(validated, quarantine_dir)
+    if not violations:
+        if not append and os.path.exists(path):
+            os.remove(path)  # quarentena de uma carga anterior do mesmo arquivo
+        return df
+
+    quarantine(df, violations, path, append)
+    mask = invalid_rows(violations, len(df))
+    print(f"Validação: {mask.sum():,} de {len(df):,} linhas de {source or 'dataset'} em quarentena ({path})",
+          file=sys.stderr)
+    for row in summarize(df, violations).itertuples():
+        print(f"  {row.rule:<17} {row.column:<20} {row.rows:>8,} linhas  ex.: {row.examples}", file=sys.stderr)
+    return df[~mask].reset_index(drop=True)
+
+
+def check_engines(source):
+    """Aplica as regras à cópia de `source` com campos vazios (ingest.blank_field_copy) lida pelos
+    dois leitores: as violações devem ser as mesmas, e só as colunas obrigatórias vazias contam
+    como ausentes. Levanta AssertionError na primeira diferença; retorna o resumo"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = ingest.blank_field_copy(source, os.path.join(directory, 'blank_fields.csv'))
+        frames = {engine: ingest.read_csv(path, engine) for engine in ('pyarrow', 'pandas')}
+    results = {engine: check(df) for engine, df in frames.items()}
+    assert results['pyarrow'].keys() == results['pandas'].keys(), results
+    for key, mask in results['pyarrow'].items():
+        assert np.array_equal(mask, results['pandas'][key]), key
+    expected = {('missing', column) for column in ingest.BLANK_FIELDS if column in REQUIRED_COLUMNS}
+    assert set(results['pandas']) == expected, sorted(results['pandas'])
+    return summarize(frames['pandas'], results['pandas'])
+
+
+if __name__ == '__main__':
+    from data_store import add_dataset_arguments, dataset_files
+
+    parser = argparse.ArgumentParser(description='Validação de qualidade dos dados (sem alterar os arquivos)')
+    parser.add_argument('--engine', choices=('auto', 'pyarrow', 'pandas'), default='auto')
+    parser.add_argument('--check-engines', action='store_true',
+                        help='Confere que pyarrow e pandas dão as mesmas violações num CSV com campos vazios')
+    args = add_dataset_arguments(parser).parse_args()
+
+    pd.set_option('display.width', None)
+    if args.check_engines:
+        if pa is None:
+            raise SystemExit("A conferência precisa do pyarrow (pip install pyarrow)")
+        summary = check_engines(args.dataset)
+        print("pyarrow e pandas com as mesmas violações no CSV com campos vazios:")
+        print(summary.to_string(index=False, float_format="%.2f"))
+        raise SystemExit(0)
+    for file_path, _ in dataset_files(args.dataset):
+        start = time.perf_counter()
+        df = ingest.read_csv(file_path, args.engine)
+        parse_time = time.perf_counter() - start
+        start = time.perf_counter()
+        violations = check(df)
+        check_time = time.perf_counter() - start
+        print(f"{file_path}: {len(df):,} linhas, leitura {parse_time:.3f} s, "
+              f"validação {check_time:.3f} s ({check_time / parse_time * 100:.1f}% da leitura)")
+        summary = summarize(df, violations)
+        print(summary.to_string(index=False, float_format="%.2f") if len(summary) else "  sem violações")